@@ -1,5 +1,6 @@
 import cv2
 import numpy as np
+from camera import LatestFrameCapture
 from skimage.morphology import skeletonize
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 from matplotlib.figure import Figure
@@ -8,7 +9,7 @@ from PIL import Image
 from motor_control import move_to_coordinate
 
 # --- Camera Setup ---
-cap = cv2.VideoCapture(1)
+cap = LatestFrameCapture(1)
 if not cap.isOpened():
     print("Camera not available")
     exit()
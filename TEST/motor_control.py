@@ -1,7 +1,12 @@
 # motor_control.py
 
+import os
+import sys
 import time
-import gpiod
+
+# Shared modules (line_shadow.py) live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from line_shadow import LineShadow
 
 MICROSTEPPING_MODE = "FULL"
 MICROSTEP_CONFIG = {
@@ -12,11 +17,12 @@ MICROSTEP_CONFIG = {
 }
 
 class StepperMotor:
-    def __init__(self, chip_name, dir_pin, step_pin, ms1_pin, ms2_pin, enable_pin, name="Motor"):
-        self.chip = gpiod.Chip(chip_name)
-        self.pins = [dir_pin, step_pin, ms1_pin, ms2_pin, enable_pin]
-        self.lines = self.chip.get_lines(self.pins)
-        self.lines.request(consumer="mp6500", type=gpiod.LINE_REQ_DIR_OUT)
+    # ms1/ms2/enable are optional for drivers that have them hard-wired
+    def __init__(self, shadow, dir_pin, step_pin, ms1_pin=None, ms2_pin=None, enable_pin=None, name="Motor"):
+        self.shadow = shadow
+        self.dir_index, self.step_index, self.ms1_index, self.ms2_index, self.enable_index = (
+            None if pin is None else shadow.index(pin)
+            for pin in (dir_pin, step_pin, ms1_pin, ms2_pin, enable_pin))
         self.name = name
         self._set_microstepping(MICROSTEPPING_MODE)
         self.enable()
@@ -25,70 +31,123 @@ class StepperMotor:
         ms_values = MICROSTEP_CONFIG[mode]
         self.microstep_values = ms_values
 
+    def _write_control(self, ms1, ms2, enable):
+        values = {self.dir_index: 0, self.step_index: 0,
+                  self.ms1_index: ms1, self.ms2_index: ms2, self.enable_index: enable}
+        values.pop(None, None)
+        self.shadow.write(values)
+
     def enable(self):
-        self.lines.set_values([0, 0, *self.microstep_values, 0])
+        self._write_control(*self.microstep_values, 0)
 
     def disable(self):
-        self.lines.set_values([0, 0, 0, 0, 1])
+        self._write_control(0, 0, 1)
 
     def set_direction(self, direction):
-        values = self.lines.get_values()
-        values[0] = direction
-        self.lines.set_values(values)
+        self.shadow.write({self.dir_index: direction})
 
     def pulse(self, delay=0.001):
-        values = self.lines.get_values()
-        values[1] = 1
-        self.lines.set_values(values)
+        self.shadow.write({self.step_index: 1})
         time.sleep(delay)
-        values[1] = 0
-        self.lines.set_values(values)
+        self.shadow.write({self.step_index: 0})
         time.sleep(delay)
 
     def cleanup(self):
         self.disable()
-        self.lines.release()
-        self.chip.close()
 
-# Initialize motors
-motorX1 = StepperMotor("gpiochip4", 20, 21, 22, 23, 24, name="X1")
-motorX2 = StepperMotor("gpiochip4", 25, 26, 27, 28, 29, name="X2")
-motorY  = StepperMotor("gpiochip4", 5, 6, 7, 8, 9, name="Y")
+class MotorGroup:
+    # Motors sharing one LineShadow. step() raises and lowers STEP on any
+    # subset of them with a single write per edge, so motors that drive the
+    # same axis move in lockstep and a combined step costs one pulse period.
+    def __init__(self, shadow, motors):
+        self.shadow = shadow
+        self.motors = list(motors)
+        self._edges = {}
+
+    def set_directions(self, directions):
+        # directions: {motor: 0/1}
+        self.shadow.write({motor.dir_index: direction for motor, direction in directions.items()})
+
+    def step(self, motors, delay=0.001):
+        edges = self._edges.get(motors)
+        if edges is None:
+            high = {motor.step_index: 1 for motor in motors}
+            low = {motor.step_index: 0 for motor in motors}
+            edges = self._edges[motors] = (high, low)
+        self.shadow.write(edges[0])
+        time.sleep(delay)
+        self.shadow.write(edges[1])
+        time.sleep(delay)
+
+# Initialize motors: one line request for every axis
+lines = LineShadow("gpiochip4", [20, 21, 22, 23, 24,
+                                 25, 26, 27, 28, 29,
+                                 5, 6, 7, 8, 9,
+                                 18, 19])
+motorX1 = StepperMotor(lines, 20, 21, 22, 23, 24, name="X1")
+motorX2 = StepperMotor(lines, 25, 26, 27, 28, 29, name="X2")
+motorY  = StepperMotor(lines, 5, 6, 7, 8, 9, name="Y")
+motorZ  = StepperMotor(lines, 18, 19, name="Z")
+motors = MotorGroup(lines, [motorX1, motorX2, motorY, motorZ])
+
+X_MOTORS = (motorX1, motorX2)
+XY_MOTORS = (motorX1, motorX2, motorY)
+Y_MOTORS = (motorY,)
+
+# Every move returns the number of set_values() ioctls it needed
 
 def moveX(steps, direction, delay=0.001):
-    motorX1.set_direction(direction)
-    motorX2.set_direction(direction)
+    start_ioctls = lines.ioctl_count
+    motors.set_directions({motorX1: direction, motorX2: direction})
     for _ in range(steps):
-        motorX1.pulse(delay)
-        motorX2.pulse(delay)
+        motors.step(X_MOTORS, delay)
+    return lines.ioctl_count - start_ioctls
 
 def moveY(steps, direction, delay=0.001):
-    motorY.set_direction(direction)
+    start_ioctls = lines.ioctl_count
+    motors.set_directions({motorY: direction})
+    for _ in range(steps):
+        motors.step(Y_MOTORS, delay)
+    return lines.ioctl_count - start_ioctls
+
+def moveZ(steps, direction, delay=0.001):
+    start_ioctls = lines.ioctl_count
+    motors.set_directions({motorZ: direction})
     for _ in range(steps):
-        motorY.pulse(delay)
+        motors.step((motorZ,), delay)
+    return lines.ioctl_count - start_ioctls
 
 def moveXY(x_steps, x_dir, y_steps, y_dir, delay=0.001):
-    motorX1.set_direction(x_dir)
-    motorX2.set_direction(x_dir)
-    motorY.set_direction(y_dir)
+    start_ioctls = lines.ioctl_count
+    motors.set_directions({motorX1: x_dir, motorX2: x_dir, motorY: y_dir})
 
     max_steps = max(x_steps, y_steps)
     x_ratio = x_steps / max_steps if x_steps else 0
     y_ratio = y_steps / max_steps if y_steps else 0
 
-    x_progress = 0.0
-    y_progress = 0.0
+    # Each axis steps whenever its accumulated progress passes a whole step
+    x_progress = 0.5
+    y_progress = 0.5
 
     for _ in range(max_steps):
-        if x_progress < 1.0:
-            motorX1.pulse(delay)
-            motorX2.pulse(delay)
-            x_progress += x_ratio
-        if y_progress < 1.0:
-            motorY.pulse(delay)
-            y_progress += y_ratio
+        x_progress += x_ratio
+        y_progress += y_ratio
+        step_x = x_progress >= 1.0
+        step_y = y_progress >= 1.0
+        if step_x:
+            x_progress -= 1.0
+        if step_y:
+            y_progress -= 1.0
+        # X1, X2 and Y edges go out together in one write
+        if step_x and step_y:
+            motors.step(XY_MOTORS, delay)
+        elif step_x:
+            motors.step(X_MOTORS, delay)
+        elif step_y:
+            motors.step(Y_MOTORS, delay)
+    return lines.ioctl_count - start_ioctls
 
 def cleanup_motors():
-    motorX1.cleanup()
-    motorX2.cleanup()
-    motorY.cleanup()
+    for motor in motors.motors:
+        motor.cleanup()
+    lines.release()
@@ -0,0 +1,190 @@
+# bench_pipeline.py
+#
+# Headless benchmark for the image-to-path pipeline. Runs every stage of a
+# snapshot (binarize -> thin -> strokes -> merge -> simplify -> order ->
+# plan) on a fixed corpus of synthetic and sample images at several
+# resolutions, plus tri.py's shape generators, and records per stage:
+#
+#   - median / min wall time over --repeats runs,
+#   - peak Python/NumPy memory from a separate tracemalloc pass (OpenCV's
+#     own allocations are not visible to tracemalloc).
+#
+# Results are written as JSON (--out) so two commits can be compared:
+#
+#   python bench_pipeline.py --out before.json
+#   python bench_pipeline.py --compare before.json
+#
+# The motor modules are imported on sim_gpio's fake GPIO, so no Pi, camera
+# or display is needed.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import sim_gpio
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SIZES = [240, 480, 960]
+SAMPLE_IMAGES = ["drawing.png", "test.png"]
+REPEATS = 5
+REGRESSION = 1.2  # --compare flags stages this much slower than the baseline
+
+_sim = sim_gpio.install()
+sys.path.insert(0, ROOT)
+import finalfn  # noqa: E402
+import tri  # noqa: E402
+_sim.uninstall()  # real clock back for the measurements
+
+
+def synthetic_image(size, seed=0):
+    """Black line art on white: straight lines, circles, a spiral and text."""
+    rng = np.random.default_rng(seed)
+    img = np.full((size, size, 3), 255, dtype=np.uint8)
+    thickness = max(1, size // 160)
+    for _ in range(12):
+        p1, p2 = rng.integers(0, size, size=(2, 2))
+        cv2.line(img, tuple(map(int, p1)), tuple(map(int, p2)), (0, 0, 0), thickness)
+    for _ in range(6):
+        c = rng.integers(size // 8, size - size // 8, size=2)
+        cv2.circle(img, tuple(map(int, c)), int(rng.integers(size // 20, size // 6)), (0, 0, 0), thickness)
+    t = np.linspace(0, 6 * np.pi, 400)
+    spiral = np.stack([size / 2 + t * np.cos(t) * size / 60, size / 2 + t * np.sin(t) * size / 60], axis=1)
+    cv2.polylines(img, [spiral.astype(np.int32)], False, (0, 0, 0), thickness)
+    cv2.putText(img, "CSE 398", (size // 10, size - size // 10), cv2.FONT_HERSHEY_SIMPLEX,
+                size / 320, (0, 0, 0), thickness)
+    return img
+
+
+def corpus(sizes):
+    for size in sizes:
+        yield "synthetic", size, synthetic_image(size)
+        for name in SAMPLE_IMAGES:
+            img = cv2.imread(os.path.join(ROOT, name))
+            if img is not None:
+                yield name, size, cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA)
+
+
+def pipeline_stages():
+    # (name, fn(previous output) -> output), in snapshot order
+    return [
+        ("binarize", finalfn.binarize),
+        ("thin", finalfn.thin),
+        ("strokes", finalfn.extract_strokes),
+        ("merge", lambda c: finalfn.merge_strokes(c, finalfn.lift_seconds(), finalfn.retrace_time)[0]),
+        ("simplify", lambda c: finalfn.simplify_contours(
+            c, finalfn.SIMPLIFY_TOLERANCE_STEPS, units="steps", method=finalfn.SIMPLIFY_METHOD,
+            steps_per_pixel=finalfn.STEPS_PER_PIXEL)[0]),
+        ("order", lambda c: finalfn.order_strokes(c)[0]),
+        ("plan", lambda c: list(finalfn.plan_path(c))),
+    ]
+
+
+def shape_stages():
+    return [
+        ("tri.generate_circle", lambda n: tri.generate_circle(100, 100, 50, num_points=n)),
+        ("tri.simulate_contour", tri.simulate_contour),
+    ]
+
+
+def run_chain(stages, data, repeats):
+    times = {name: [] for name, _ in stages}
+    for _ in range(repeats):
+        value = data
+        for name, fn in stages:
+            start = time.perf_counter()
+            value = fn(value)
+            times[name].append(time.perf_counter() - start)
+
+    peaks = {}
+    tracemalloc.start()
+    value = data
+    for name, fn in stages:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        value = fn(value)
+        peaks[name] = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return [{
+        "stage": name,
+        "median_ms": round(statistics.median(times[name]) * 1000, 3),
+        "min_ms": round(min(times[name]) * 1000, 3),
+        "peak_kb": round(peaks[name] / 1024, 1),
+    } for name, _ in stages]
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    import skimage
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "skimage": skimage.__version__,
+        "contour_method": finalfn.CONTOUR_METHOD,
+        "thinning": finalfn.thinning.resolve(finalfn.THINNING_BACKEND),
+        "execution_mode": finalfn.EXECUTION_MODE,
+    }
+
+
+def run_benchmark(sizes=SIZES, repeats=REPEATS):
+    results = []
+    for image, size, img in corpus(sizes):
+        for row in run_chain(pipeline_stages(), img, repeats):
+            results.append(dict(row, image=image, size=size))
+            print(f"{image:>12} {size:5d} {row['stage']:<22} {row['median_ms']:10.2f} ms {row['peak_kb']:10.1f} KiB")
+    for points in (120, 10000):
+        for row in run_chain(shape_stages(), points, repeats):
+            results.append(dict(row, image="tri_shapes", size=points))
+            print(f"{'tri_shapes':>12} {points:5d} {row['stage']:<22} {row['median_ms']:10.2f} ms {row['peak_kb']:10.1f} KiB")
+    return {"meta": metadata(), "repeats": repeats, "results": results}
+
+
+def compare(report, baseline, threshold=REGRESSION):
+    """Print median time ratios against a baseline report; returns the regressed rows."""
+    old = {(r["image"], r["size"], r["stage"]): r for r in baseline["results"]}
+    regressed = []
+    for row in report["results"]:
+        before = old.get((row["image"], row["size"], row["stage"]))
+        if not before or not before["median_ms"]:
+            continue
+        ratio = row["median_ms"] / before["median_ms"]
+        flag = "  <-- slower" if ratio > threshold else ""
+        print(f"{row['image']:>12} {row['size']:5d} {row['stage']:<22} x{ratio:5.2f}{flag}")
+        if flag:
+            regressed.append(row)
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the image-to-path pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sizes, args.repeats)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(report, json.load(f))
+        sys.exit(1 if regressed else 0)
@@ -0,0 +1,109 @@
+# bench_startup.py
+#
+# Cold-start cost of the drawing entry points. Each script is loaded in a
+# fresh interpreter (module-level code only, main() is not called) with
+# python -X importtime and sim_gpio's fake GPIO, and the report lists:
+#
+#   - wall time to load the script, minus the same harness loading an
+#     empty script,
+#   - the top-level imports it pays for, by cumulative import time,
+#   - what the deferred imports (skeletonize, matplotlib, PIL) cost when
+#     the first snapshot loads them.
+#
+#   python bench_startup.py                  # the default entry points
+#   python bench_startup.py ../CV.py --json  # any scripts, JSON output
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+ENTRY_POINTS = [
+    os.path.join(HERE, "finalfn.py"),
+    os.path.join(ROOT, "TEST9", "final.py"),
+    os.path.join(ROOT, "CV.py"),
+    os.path.join(ROOT, "NEWLIBTEST.py"),
+]
+DEFERRED = ["skimage.morphology", "matplotlib.backends.backend_agg", "PIL.Image"]
+RUNS = 3
+TOP = 8
+
+LOAD = ("import sys; sys.path[:0] = [{here!r}, {script_dir!r}]; import sim_gpio; sim_gpio.install(); "
+        "import runpy; runpy.run_path({script!r}, run_name='startup_bench')")
+
+
+def _run(code):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, cwd=HERE)
+    elapsed = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return elapsed, proc.stderr
+
+
+def top_level_imports(importtime_log):
+    """{module: cumulative seconds} for the imports made directly by the script."""
+    imports = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):
+            continue  # nested import, already counted in its parent
+        imports[name.strip()] = int(cumulative) / 1e6
+    return imports
+
+
+def _load(script, runs):
+    code = LOAD.format(here=HERE, script_dir=os.path.dirname(script), script=script)
+    best, log = None, ""
+    for _ in range(runs):
+        elapsed, stderr = _run(code)
+        if best is None or elapsed < best:
+            best, log = elapsed, stderr
+    return best, top_level_imports(log)
+
+
+def measure(script, runs=RUNS):
+    # Interpreter start-up, sim_gpio and runpy are the harness, not the script
+    with tempfile.NamedTemporaryFile("w", suffix=".py") as empty:
+        baseline, harness = _load(empty.name, runs)
+    best, imports = _load(script, runs)
+    for name in harness:
+        imports.pop(name, None)
+    return {
+        "script": os.path.relpath(script, ROOT),
+        "startup_s": round(best - baseline, 3),
+        "imports": {name: round(s, 3) for name, s in sorted(imports.items(), key=lambda kv: -kv[1])[:TOP]},
+    }
+
+
+def deferred_costs(runs=RUNS):
+    costs = {}
+    for module in DEFERRED:
+        # numpy/cv2 are already loaded by then, so count only what the module adds
+        base = min(_run("import numpy, cv2")[0] for _ in range(runs))
+        total = min(_run(f"import numpy, cv2, {module}")[0] for _ in range(runs))
+        costs[module] = round(total - base, 3)
+    return costs
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--json"]
+    scripts = [os.path.abspath(a) for a in args] or ENTRY_POINTS
+    report = {"entry_points": [measure(s) for s in scripts], "deferred": deferred_costs()}
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=1))
+    else:
+        for entry in report["entry_points"]:
+            print(f"{entry['script']:<22} {entry['startup_s']:6.3f} s")
+            for name, seconds in entry["imports"].items():
+                print(f"    {name:<34} {seconds:6.3f} s")
+        print("deferred until first use:")
+        for name, seconds in report["deferred"].items():
+            print(f"    {name:<34} {seconds:6.3f} s")
@@ -0,0 +1,20 @@
+# conftest.py
+#
+# The tests run on the simulated hardware (sim_gpio.py): fake RPi.GPIO and
+# gpiod lines that record every transition, and a virtual clock. It has to
+# be installed before finalfn and the other motor scripts are imported.
+
+import os
+
+import pytest
+
+os.environ["PLOTTER_SIM"] = "1"
+
+import sim_gpio
+
+simulation = sim_gpio.install()
+
+
+@pytest.fixture
+def sim():
+    return simulation
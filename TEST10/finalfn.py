@@ -1,24 +1,51 @@
 import cv2
 import numpy as np
-from skimage.morphology import skeletonize
-import gpiod
+import json
+import os
+import sys
+if os.environ.get("PLOTTER_SIM"):
+    # Fake GPIO lines and a virtual clock instead of the hardware (sim_gpio.py)
+    import sim_gpio
+    simulation = sim_gpio.install()
+else:
+    simulation = None
 import time
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from matplotlib.figure import Figure
-import io
-from PIL import Image
-import RPi.GPIO as GPIO
+from motion_profile import MotionProfile, path_profile
+from lookahead import plan_contour
+from step_backend import build_waveform, make_backend
+from motion_worker import MotionWorker, check_stop
+from step_stream import DIR_X, DIR_Y, STEP_X, STEP_Y, moves_to_stream, polyline_to_stream, stream_duration
+from stroke_order import order_strokes
+from simplify import simplify_contours
+from skeleton_graph import skeleton_strokes
+from stroke_merge import merge_strokes
+from pen_scheduler import AXIS_X, AXIS_Y, AXIS_Z, net_steps, plan_pen_travel, run_timeline, timeline_to_waveform
+from plot_profiler import format_eta, profile_plot
+from step_timing import EdgeTimer
+from preview import CameraView, PreviewRenderer
+from snapshot_worker import SnapshotPipeline, Split, run_inline
+import thinning
+# Shared modules (camera.py) live in the repository root; appended, so the
+# modules next to this script come first
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from camera import LatestFrameCapture
 
 # --- Motor Setup ---
-GPIO.setmode(GPIO.BCM)  # Use BCM numbering
+# RPi.GPIO is imported and the pins are claimed by acquire_hardware() on the
+# first motion command, so planning, previews and imports never touch them
+GPIO = None
+hardware_ready = False
 
 class StepperMotor:
-    def __init__(self, dir_pin, step_pin, name="Motor"):
+    def __init__(self, dir_pin, step_pin, name="Motor", profile=None, backend=None, timer=None):
         self.dir_pin = dir_pin
         self.step_pin = step_pin
         self.name = name
+        self.profile = profile  # MotionProfile for this axis, None = fixed delay
+        self.backend = backend  # step_backend waveform backend, None = sleep-timed pulses
+        self.timer = timer  # step_timing.EdgeTimer to time every pulse, None = off
 
-        GPIO.setmode(GPIO.BCM)
+    def setup(self):
         GPIO.setup(self.dir_pin, GPIO.OUT)
         GPIO.setup(self.step_pin, GPIO.OUT)
 
@@ -29,11 +56,19 @@ class StepperMotor:
         GPIO.output(self.dir_pin, GPIO.HIGH if direction else GPIO.LOW)
 
     def pulse(self, delay=0.001):
+        if self.timer is not None:
+            self.timer.record(time.perf_counter(), 2 * delay)
         GPIO.output(self.step_pin, GPIO.HIGH)
         time.sleep(delay)
         GPIO.output(self.step_pin, GPIO.LOW)
         time.sleep(delay)
 
+    def step(self):
+        # Bare STEP edge for deadline-timed callers; the GPIO calls alone are
+        # longer than the driver's minimum pulse width
+        GPIO.output(self.step_pin, GPIO.HIGH)
+        GPIO.output(self.step_pin, GPIO.LOW)
+
     def pulseZ(self, delay, steps):
         for _ in range(steps):
             GPIO.output(self.step_pin, GPIO.HIGH)
@@ -46,67 +81,316 @@ class StepperMotor:
         GPIO.output(self.dir_pin, GPIO.LOW)
         GPIO.output(self.step_pin, GPIO.LOW)
 
-motorX = StepperMotor(12, 16, name="X")
-motorY = StepperMotor(13, 6, name="Y")
-motorZ = StepperMotor(18, 19, name="Z")  
+# Per-axis limits in steps/s, steps/s^2 (and steps/s^3 for S-curve ramps).
+# start_velocity matches the old fixed 2 ms step period.
+XY_PROFILE = MotionProfile(max_velocity=2000, acceleration=4000, jerk=None, start_velocity=500)
+
+# None: sleep-timed pulses, "software": deadline-timed waveform replay,
+# "pigpio": DMA-timed waveforms (needs the pigpiod daemon)
+STEP_BACKEND = None
+
+# Time every X/Y step (moves, streams and pen travel) and report rate, jitter
+# and overruns per move
+STEP_TIMING = False
+step_timer = EdgeTimer() if STEP_TIMING else None
+
+motorX = StepperMotor(12, 16, name="X", profile=XY_PROFILE, timer=step_timer)
+motorY = StepperMotor(13, 6, name="Y", profile=XY_PROFILE, timer=step_timer)
+
+Z_STEPS = 100     # default paper contact, steps below the start-up position
+Z_DELAY = 0.007   # old fixed half-period, now the profile's start speed
+PEN_SETTLE = 0.5  # s, lets the marker settle after every Z move
+
+# Z ramps like X/Y instead of stepping at the fixed Z_DELAY rate
+Z_PROFILE = MotionProfile(max_velocity=600, acceleration=3000, jerk=None, start_velocity=1 / (2 * Z_DELAY))
+motorZ = StepperMotor(18, 19, name="Z", profile=Z_PROFILE)
+
+# Between strokes the pen only rises Z_LIFT_STEPS above the calibrated
+# contact point (the smallest clearance the paper allows)
+Z_LIFT_STEPS = 60
+Z_JOG_STEPS = 5
+Z_CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "z_calibration.json")
+
+# Overlap pen lifts with XY travel (pen_scheduler.py): Z starts rising
+# PEN_LIFT_LEAD s before a stroke ends, travel starts once the pen is
+# Z_CLEARANCE_STEPS above the paper and Z comes down during the approach
+OVERLAP_PEN_MOVES = True
+Z_CLEARANCE_STEPS = 40
+PEN_LIFT_LEAD = 0.02
+
+def load_z_calibration():
+    # Contact point in steps towards the paper from where Z sits at start-up.
+    # There is no Z end stop, so park the pen at the top before powering on.
+    try:
+        with open(Z_CALIBRATION_FILE) as f:
+            return int(json.load(f)["contact_steps"])
+    except (OSError, ValueError, KeyError):
+        return Z_STEPS
+
+z_contact = load_z_calibration()
+z_calibration_mtime = None
+z_position = 0  # steps towards the paper from the start-up position
+
+def refresh_z_calibration():
+    # z_calibrate() runs in the motion worker; the UI and snapshot processes
+    # pick the new contact point up from the file before planning or estimating
+    global z_contact, z_calibration_mtime
+    try:
+        mtime = os.stat(Z_CALIBRATION_FILE).st_mtime_ns
+    except OSError:
+        return
+    if mtime != z_calibration_mtime:
+        z_calibration_mtime = mtime
+        z_contact = load_z_calibration()
+
+def z_clearance():
+    # Pen-up height. Z starts parked at the top and has no end stop, so never
+    # go above the start-up position, even when the contact point is closer
+    # to it than Z_LIFT_STEPS
+    return max(z_contact - Z_LIFT_STEPS, 0)
+
+def z_lift_steps():
+    return max(z_contact - z_clearance(), 0)
+
+def z_intervals(steps):
+    if motorZ.profile:
+        return motorZ.profile.step_intervals(steps)
+    return [2 * Z_DELAY] * steps
+
+def z_move_to(target):
+    global z_position
+    target = max(target, 0)  # above the start-up position there is no end stop
+    steps = target - z_position
+    motorZ.set_direction(0 if steps > 0 else 1)  # 0 = towards the paper
+    direction = 1 if steps > 0 else -1
+    for interval in z_intervals(abs(steps)):
+        check_stop()
+        motorZ.pulse(interval / 2)
+        z_position += direction  # stays right if an emergency stop cuts the move short
 
 def z_down():
-    motorZ.set_direction(1)  # Down
-    motorZ.pulseZ(delay=0.007, steps=100)
+    z_move_to(z_clearance())  # Pen up to the clearance height
 
 def z_up():
-    motorZ.set_direction(0)  # Up
-    motorZ.pulseZ(delay=0.007, steps=100)
-
-def moveXY(x_steps, x_dir, y_steps, y_dir, delay=0.001):
-    motorX.set_direction(x_dir)
-    motorY.set_direction(y_dir)
-
-    x = 0
-    y = 0
+    z_move_to(z_contact)  # Pen onto the paper
+
+def z_home():
+    z_move_to(0)
+
+def z_jog(steps):
+    # Positive = towards the paper; used while calibrating the contact point
+    z_move_to(z_position + steps)
+
+def z_calibrate():
+    # Record the current Z position as the paper contact point
+    global z_contact
+    z_contact = z_position
+    with open(Z_CALIBRATION_FILE, "w") as f:
+        json.dump({"contact_steps": z_contact}, f)
+    print(f"Z contact saved at {z_contact} steps")
+
+def plan_travel_timeline(lead, travel, lower=True):
+    lift_steps = z_lift_steps()
+    lift = z_intervals(lift_steps)
+    return plan_pen_travel(move_stream(lead), move_stream(travel), lift, lift,
+                           min(Z_CLEARANCE_STEPS, lift_steps), PEN_LIFT_LEAD, lower, up_dir=1, down_dir=0)
+
+def pen_travel(lead, travel, lower=True):
+    # lead: the stroke's last "move" command (or None), travel: the pen-up "move"
+    global z_position
+    events, _ = plan_travel_timeline(lead, travel, lower)
+
+    backend = motorX.backend
+    if backend is not None and backend is motorY.backend:
+        pins = {AXIS_X: (motorX.dir_pin, motorX.step_pin), AXIS_Y: (motorY.dir_pin, motorY.step_pin),
+                AXIS_Z: (motorZ.dir_pin, motorZ.step_pin)}
+        check_stop()
+        backend.run(timeline_to_waveform(events, pins))
+        z_position -= net_steps(events).get(AXIS_Z, 0)  # Z direction 1 is away from the paper
+    else:
+        # Counted as the steps go out, so an emergency stop mid-timeline
+        # leaves z_position where Z really is
+        moved = {}
+        if step_timer is not None:
+            step_timer.begin()
+        try:
+            run_timeline(events, {AXIS_X: motorX, AXIS_Y: motorY, AXIS_Z: motorZ}, check_stop, moved, step_timer)
+        finally:
+            z_position -= moved.get(AXIS_Z, 0)
+        report_step_timing("pen travel")
+    if lower:
+        time.sleep(PEN_SETTLE)
+
+def move_stream(command):
+    # step_stream records for a "move" command, timed like moveXY would run it
+    if command is None:
+        return None
+    x_steps, x_dir, y_steps, y_dir, v_in, v_out = command[1:]
+    intervals = None
+    if motorX.profile and motorY.profile:
+        intervals = path_profile(motorX.profile, motorY.profile, x_steps, y_steps).step_intervals(
+            max(x_steps, y_steps), v_in, v_out)
+    return moves_to_stream([x_steps], [x_dir], [y_steps], [y_dir], intervals=intervals)
+
+def moveXY(x_steps, x_dir, y_steps, y_dir, delay=0.001, profile=None, entry_velocity=None, exit_velocity=None):
+    # profile: MotionProfile used for both axes, False to force the fixed delay.
+    # Defaults to the motors' own profiles when they have one.
+    # entry/exit_velocity (major-axis steps/s) let planned moves flow into each other.
     dx = x_steps
     dy = y_steps
-    sx = 1
-    sy = 1
 
+    x_profile = motorX.profile if profile is None else profile
+    y_profile = motorY.profile if profile is None else profile
+    if x_profile and y_profile:
+        # One interval per major-axis step; it is split between both pulses
+        # when the minor axis steps too, so the planned speed is kept
+        intervals = path_profile(x_profile, y_profile, dx, dy).step_intervals(
+            max(dx, dy), entry_velocity, exit_velocity)
+    else:
+        intervals = None
+
+    # Bresenham: which motors step on every step of the major axis
     if dx > dy:
-        err = dx / 2.0
-        for _ in range(dx):
-            motorX.pulse(delay)
-            x += sx
-            err -= dy
-            if err < 0:
-                motorY.pulse(delay)
-                y += sy
-                err += dx
+        major, minor, n_major, n_minor = motorX, motorY, dx, dy
     else:
-        err = dy / 2.0
-        for _ in range(dy):
-            motorY.pulse(delay)
-            y += sy
-            err -= dx
-            if err < 0:
-                motorX.pulse(delay)
-                x += sx
-                err += dy
+        major, minor, n_major, n_minor = motorY, motorX, dy, dx
+    schedule = []
+    err = n_major / 2.0
+    for i in range(n_major):
+        err -= n_minor
+        if err < 0:
+            err += n_major
+            motors = (major, minor)
+        else:
+            motors = (major,)
+        schedule.append((motors, intervals[i] if intervals else 2 * delay * len(motors)))
+
+    backend = motorX.backend
+    if backend is not None and backend is motorY.backend:
+        # Whole move as one pre-computed waveform, stepping both axes together
+        steps = [([m.step_pin for m in motors], interval) for motors, interval in schedule]
+        check_stop()
+        backend.run(build_waveform({motorX.dir_pin: x_dir, motorY.dir_pin: y_dir}, steps))
+        return
+
+    motorX.set_direction(x_dir)
+    motorY.set_direction(y_dir)
+    if step_timer is not None:
+        step_timer.begin()
+    for motors, interval in schedule:
+        check_stop()
+        for motor in motors:
+            motor.pulse(interval / (2 * len(motors)))
+    report_step_timing("move")
+
+def report_step_timing(label):
+    if step_timer is None:
+        return
+    report = step_timer.end()
+    if report and report["overruns"]:
+        print(f"Step timing ({label}): {report}")
+
+def acquire_hardware():
+    global GPIO, hardware_ready
+    if hardware_ready:
+        return
+    import RPi.GPIO
+    GPIO = RPi.GPIO
+    GPIO.setmode(GPIO.BCM)  # Use BCM numbering
+    for motor in (motorX, motorY, motorZ):
+        motor.setup()
+    motorX.backend = motorY.backend = make_backend(STEP_BACKEND)
+    hardware_ready = True
 
 def cleanup_all():
+    if not hardware_ready:
+        return
     motorX.cleanup()
     motorY.cleanup()
     motorZ.cleanup()
     GPIO.cleanup()
 
 # --- Skeleton Processing ---
-def process_image(frame):
+# "graph": every skeleton edge once, as an ordered polyline (skeleton_graph.py)
+# "contours": cv2.findContours, which traces both sides of each stroke
+CONTOUR_METHOD = "graph"
+
+def binarize(frame):
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     _, binary = cv2.threshold(gray, 80, 255, cv2.THRESH_BINARY_INV)
-    skeleton = skeletonize(binary > 0).astype(np.uint8) * 255
+    return binary
+
+# Thinning backend (thinning.py): "auto", "skimage", "lut", "zhangsuen" or "guohall"
+THINNING_BACKEND = os.environ.get("PLOTTER_THINNING", "auto")
+
+# Thin only crops around the ink (thinning.thin_roi), not the whole frame
+THIN_ROI = True
+# Thin frames of thinning.TILED_MIN_PIXELS and up in tiles on several cores
+# (snapshots: on the snapshot pool, see process_snapshot)
+THIN_TILED = True
+
+def thin(binary):
+    if THIN_TILED and binary.size >= thinning.TILED_MIN_PIXELS:
+        return thinning.thin_tiled(binary, THINNING_BACKEND)
+    if THIN_ROI:
+        return thinning.thin_roi(binary, THINNING_BACKEND)
+    return thinning.thin(binary, THINNING_BACKEND)
+
+def extract_strokes(skeleton):
+    if CONTOUR_METHOD == "graph":
+        return skeleton_strokes(skeleton)
     contours, _ = cv2.findContours(skeleton, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
-    return skeleton, contours
+    return contours
+
+def process_image(frame):
+    skeleton = thin(binarize(frame))
+    return skeleton, extract_strokes(skeleton)
 
 # --- Motion Execution ---
 STEPS_PER_PIXEL = 3
 
+# "direct": straight line from the first to the last contour point
+# "lookahead": follow every contour point as one blended velocity profile
+# "stream": follow every contour point from a pre-generated step stream
+EXECUTION_MODE = "direct"
+
+# Collapse near-collinear contour points into long segments (0 disables)
+SIMPLIFY_TOLERANCE_STEPS = 1.5
+SIMPLIFY_METHOD = "rdp"  # or "visvalingam"
+SIMPLIFY_REPORT = False  # print vertices and drawing time saved (plans every contour twice)
+
+def planned_move_time(x_steps, y_steps, entry_velocity=None, exit_velocity=None):
+    # How long moveXY takes for a move; every time estimate goes through here
+    if not (motorX.profile and motorY.profile):
+        # moveXY's fixed delay: 2 ms per major step, 4 ms when both motors step
+        return 2 * 0.001 * (x_steps + y_steps)
+    return path_profile(motorX.profile, motorY.profile, x_steps, y_steps).duration(
+        max(x_steps, y_steps), entry_velocity, exit_velocity)
+
+def travel_time(dx, dy):
+    # A pen-up move of dx, dy px, priced like move_command() + moveXY run it
+    return planned_move_time(int(abs(dx) * STEPS_PER_PIXEL), int(abs(dy) * STEPS_PER_PIXEL))
+
+def retrace_time(points):
+    # Drawing an existing stroke path again, as the execution mode draws it
+    return drawing_time([np.asarray(points, dtype=np.int32).reshape(-1, 1, 2)])
+
+# Chain connected strokes into as few pen-down walks as possible. Only for
+# the modes that follow every vertex: "direct" draws a contour as the chord
+# from its first to its last point, which is meaningless for a merged walk.
+MERGE_STROKES = True
+MERGE_MODES = ("lookahead", "stream")
+
+def lift_seconds():
+    # What one pen lift costs with the current contact point
+    if OVERLAP_PEN_MOVES:
+        # Only the moves through the clearance height and the final settle hold XY up
+        return 2 * sum(z_intervals(min(Z_CLEARANCE_STEPS, z_lift_steps()))) + PEN_SETTLE
+    return 2 * (sum(z_intervals(z_lift_steps())) + PEN_SETTLE)  # pen up + down with settling
+
+# Reorder/flip contours to minimise pen-up travel before plotting
+ORDER_STROKES = True
+
 def wait_for_key_prompt(window_name, message):
     prompt_canvas = np.ones((100, 480 + BUTTON_WIDTH, 3), dtype=np.uint8) * 30
     cv2.putText(prompt_canvas, message, (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
@@ -116,57 +400,187 @@ def wait_for_key_prompt(window_name, message):
         if key == ord('n'):
             break
 
-def execute_path(contours):
+def replay_stream(stream):
+    # Output loop for step_stream records: all planning is done, only GPIO writes remain
+    motors_for_mask = {STEP_X: (motorX,), STEP_Y: (motorY,), STEP_X | STEP_Y: (motorX, motorY)}
+
+    backend = motorX.backend
+    if backend is not None and backend is motorY.backend:
+        # One waveform per run of records with the same directions
+        records = stream.tolist()
+        start = 0
+        while start < len(records):
+            direction = records[start][1]
+            end = start
+            while end < len(records) and records[end][1] == direction:
+                end += 1
+            steps = [([m.step_pin for m in motors_for_mask[step]], dt) for step, _, dt in records[start:end]]
+            check_stop()
+            backend.run(build_waveform({motorX.dir_pin: direction & DIR_X, motorY.dir_pin: direction & DIR_Y}, steps))
+            start = end
+        return
+
+    last_dir = None
+    if step_timer is not None:
+        step_timer.begin()
+    for step, direction, dt in stream.tolist():
+        check_stop()
+        if direction != last_dir:
+            motorX.set_direction(direction & DIR_X)
+            motorY.set_direction(direction & DIR_Y)
+            last_dir = direction
+        motors = motors_for_mask[step]
+        for motor in motors:
+            motor.pulse(dt / (2 * len(motors)))
+    report_step_timing("stream")
+
+def move_command(dx, dy):
+    steps_x = int(abs(dx) * STEPS_PER_PIXEL)
+    steps_y = int(abs(dy) * STEPS_PER_PIXEL)
+    dir_x = 1 if dx > 0 else 0
+    dir_y = 1 if dy > 0 else 0
+    return ("move", steps_x, dir_x, steps_y, dir_y, None, None)
+
+def lift_and_travel(last, travel, lower=True):
+    # Ends a stroke: its last drawing command, pen up, travel, pen down
+    if OVERLAP_PEN_MOVES:
+        # Only a plain move can overlap with the lift; a stream runs first
+        lead = last if last[0] == "move" else None
+        if lead is None:
+            yield last
+        yield ("pen_travel", lead, travel, lower)
+        return
+    yield last
+    yield ("pen_up",)
+    yield travel
+    if lower:
+        yield ("pen_down",)
+
+def stroke_commands(contour, mode=None):
+    # The pen-down commands that draw one contour, starting at its first point
+    mode = mode or EXECUTION_MODE
+    if mode == "lookahead":
+        # Needs motorX/motorY profiles: segments hand their speed over at each junction
+        points = [tuple(p[0]) for p in contour]
+        return [("move", x_steps, x_dir, y_steps, y_dir, v_in, v_out)
+                for x_steps, x_dir, y_steps, y_dir, v_in, v_out in plan_contour(
+                    points, STEPS_PER_PIXEL, motorX.profile, motorY.profile)] or [move_command(0, 0)]
+    if mode == "stream":
+        points = contour.reshape(-1, 2)
+        return [("stream", polyline_to_stream(points, STEPS_PER_PIXEL,
+                                              x_profile=motorX.profile, y_profile=motorY.profile))]
+    # Draw straight line to end point
+    (first_x, first_y), (last_x, last_y) = contour[0][0], contour[-1][0]
+    return [move_command(last_x - first_x, last_y - first_y)]
+
+def plan_path(contours, mode=None):
+    # Yields the motion commands for a drawing as plain tuples, to run with
+    # run_command() here or to hand to the MotionWorker process
+    mode = mode or EXECUTION_MODE
     current_x = 0
     current_y = 0
+    last = None  # the pen is down and this stroke command has not been sent yet
 
     for i, contour in enumerate(contours):
         if len(contour) < 2:
             continue
 
-        # Move to start point
+        # Move to start point and lower the pen
         first_x, first_y = contour[0][0]
-        dx = first_x - current_x
-        dy = first_y - current_y
-        steps_x = int(abs(dx) * STEPS_PER_PIXEL)
-        steps_y = int(abs(dy) * STEPS_PER_PIXEL)
-        dir_x = 1 if dx > 0 else 0
-        dir_y = 1 if dy > 0 else 0
-        moveXY(steps_x, dir_x, steps_y, dir_y)
-        current_x, current_y = first_x, first_y
-
-        # Lower pen to draw
+        travel = move_command(first_x - current_x, first_y - current_y)
+        if last is not None:
+            yield from lift_and_travel(last, travel)
+        else:
+            yield travel
+            yield ("pen_down",)
+        strokes = stroke_commands(contour, mode)
+        current_x, current_y = contour[-1][0]
+
+        # Hold the last one back so the pen lift can start while it finishes
+        yield from strokes[:-1]
+        last = strokes[-1]
+
+    # Raise pen and return to origin
+    home = move_command(0 - current_x, 0 - current_y)
+    if last is not None:
+        yield from lift_and_travel(last, home, lower=False)
+    else:
+        yield home
+    yield ("z_home",)
+
+def run_command(command):
+    if not hardware_ready:
+        acquire_hardware()
+    kind = command[0]
+    if kind == "move":
+        x_steps, x_dir, y_steps, y_dir, v_in, v_out = command[1:]
+        moveXY(x_steps, x_dir, y_steps, y_dir, entry_velocity=v_in, exit_velocity=v_out)
+    elif kind == "stream":
+        replay_stream(command[1])
+    elif kind == "pen_travel":
+        pen_travel(*command[1:])
+    elif kind == "pen_down":
         z_up()
-        time.sleep(0.5)
-
-        # Draw straight line to end point
-        last_x, last_y = contour[-1][0]
-        dx = last_x - current_x
-        dy = last_y - current_y
-        steps_x = int(abs(dx) * STEPS_PER_PIXEL)
-        steps_y = int(abs(dy) * STEPS_PER_PIXEL)
-        dir_x = 1 if dx > 0 else 0
-        dir_y = 1 if dy > 0 else 0
-        moveXY(steps_x, dir_x, steps_y, dir_y)
-        current_x, current_y = last_x, last_y
-
-        # Raise pen
+        time.sleep(PEN_SETTLE)  # small delay to let marker settle
+    elif kind == "pen_up":
         z_down()
-        time.sleep(0.5)
-
-    # Return to origin
-    dx = 0 - current_x
-    dy = 0 - current_y
-    steps_x = int(abs(dx) * STEPS_PER_PIXEL)
-    steps_y = int(abs(dy) * STEPS_PER_PIXEL)
-    dir_x = 1 if dx > 0 else 0
-    dir_y = 1 if dy > 0 else 0
-    moveXY(steps_x, dir_x, steps_y, dir_y)
+        time.sleep(PEN_SETTLE)
+    elif kind == "z_home":
+        z_home()
+    elif kind == "z_jog":
+        z_jog(command[1])
+    elif kind == "z_calibrate":
+        z_calibrate()
+    else:
+        raise ValueError(f"Unknown motion command: {kind}")
+
+# Extra time per XY step for the GPIO calls of sleep-timed pulses, on top of
+# the planned step timing (measure it on the Pi; 0 assumes perfect timing)
+STEP_OVERHEAD = 0.0
+
+def command_duration(command):
+    # How long run_command() takes for a command, worked out without moving anything
+    kind = command[0]
+    if kind == "move":
+        x_steps, _, y_steps, _, v_in, v_out = command[1:]
+        return planned_move_time(x_steps, y_steps, v_in, v_out)
+    if kind == "stream":
+        return stream_duration(command[1])
+    if kind == "pen_travel":
+        _, duration = plan_travel_timeline(*command[1:])
+        return duration + (PEN_SETTLE if command[3] else 0.0)
+    if kind in ("pen_down", "pen_up"):
+        # Nominal lift; the first pen down of a plot starts from wherever Z is
+        return sum(z_intervals(z_lift_steps())) + PEN_SETTLE
+    if kind == "z_home":
+        return sum(z_intervals(z_clearance()))
+    if kind == "z_jog":
+        return sum(z_intervals(abs(command[1])))
+    return 0.0
+
+def drawing_time(contours, mode=None):
+    # Pen-down time for contours as the execution mode would draw them
+    return sum(command_duration(command) for contour in contours if len(contour) >= 2
+               for command in stroke_commands(contour, mode))
+
+def estimate_plot(commands):
+    refresh_z_calibration()
+    return profile_plot(commands, command_duration, STEPS_PER_PIXEL, STEP_OVERHEAD)
+
+def execute_path(contours, mode=None):
+    for command in plan_path(contours, mode):
+        run_command(command)
 
 
 # --- Camera and UI ---
 BUTTON_WIDTH = 150
 DISPLAY_SIZE = 480
+# Snapshots are processed at PROCESS_SIZE px square; the strokes are then
+# scaled to the DISPLAY_SIZE grid that STEPS_PER_PIXEL is calibrated for.
+# Tiled thinning only kicks in at PROCESS_SIZE >= 1200 (thinning.TILED_MIN_PIXELS),
+# which also needs a camera mode at least that tall (CAPTURE_SIZE)
+PROCESS_SIZE = int(os.environ.get("PLOTTER_PROCESS_SIZE", DISPLAY_SIZE))
+CAPTURE_SIZE = None  # (width, height) to ask the camera for; None keeps its default
 WINDOW_NAME = "XY Control"
 button_coords = (DISPLAY_SIZE + 10, 200, DISPLAY_SIZE + BUTTON_WIDTH - 10, 280)
 button_clicked = False
@@ -178,70 +592,256 @@ def mouse_callback(event, x, y, flags, param):
         if x1 <= x <= x2 and y1 <= y <= y2:
             button_clicked = True
 
-cv2.namedWindow(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN)
-cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-cv2.setMouseCallback(WINDOW_NAME, mouse_callback)
-
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("Camera not available")
-    exit()
-
-try:
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            continue
-
-        h, w = frame.shape[:2]
-        min_dim = min(h, w)
-        cx, cy = w // 2, h // 2
-        square_frame = frame[cy - min_dim//2:cy + min_dim//2, cx - min_dim//2:cx + min_dim//2]
-        square_frame = cv2.resize(square_frame, (DISPLAY_SIZE, DISPLAY_SIZE))
-
-        canvas_width = DISPLAY_SIZE + BUTTON_WIDTH
-        canvas = np.ones((DISPLAY_SIZE, canvas_width, 3), dtype=np.uint8) * 50
-        canvas[:, :DISPLAY_SIZE] = square_frame
-
-        x1, y1, x2, y2 = button_coords
-        cv2.rectangle(canvas, (x1, y1), (x2, y2), (200, 200, 200), -1)
-        cv2.putText(canvas, "Snapshot", (x1 + 10, y1 + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
-
-        cv2.imshow(WINDOW_NAME, canvas)
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
-
-        if button_clicked:
-            skeleton, contours = process_image(square_frame)
-
-            # Show contour overlay
-            fig = Figure(figsize=(5, 5), dpi=100)
-            ax = fig.add_subplot(1, 1, 1)
-            for contour in contours:
-                coords = contour.reshape(-1, 2)
-                xs, ys = zip(*coords)
-                ax.plot(xs, ys, marker='.', linestyle='-', linewidth=0.5)
-            ax.set_title("Skeleton Contours")
-            ax.invert_yaxis()
-            ax.axis('equal')
-            ax.grid(True)
-            canvas_plot = FigureCanvas(fig)
-            buf = io.BytesIO()
-            canvas_plot.print_png(buf)
-            buf.seek(0)
-            img_pil = Image.open(buf).convert('RGB')
-            img_np = np.array(img_pil)
-            plot_img = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
-            cv2.imshow("Skeleton Plot", plot_img)
-            cv2.waitKey(3000)
+def square_crop(frame, size=PROCESS_SIZE):
+    h, w = frame.shape[:2]
+    min_dim = min(h, w)
+    cx, cy = w // 2, h // 2
+    square_frame = frame[cy - min_dim//2:cy + min_dim//2, cx - min_dim//2:cx + min_dim//2]
+    return cv2.resize(square_frame, (size, size))
+
+def to_display_grid(contours, size):
+    # Contours found in a size x size frame -> DISPLAY_SIZE px coordinates
+    if size == DISPLAY_SIZE:
+        return contours
+    scale = DISPLAY_SIZE / size
+    scaled = []
+    for contour in contours:
+        points = np.rint(contour.reshape(-1, 2) * scale).astype(np.int32)
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = (points[1:] != points[:-1]).any(axis=1)  # drop points that collapsed together
+        scaled.append(points[keep].reshape(-1, 1, 2))
+    return scaled
+
+def prepare_contours(square_frame):
+    skeleton, contours = process_image(square_frame)
+    return prepare_strokes(contours, square_frame.shape[0])
+
+def prepare_strokes(contours, size):
+    # Strokes found in a size x size frame -> the contours to plot, in order
+    refresh_z_calibration()
+    contours = to_display_grid(contours, size)
+    if MERGE_STROKES and EXECUTION_MODE in MERGE_MODES:
+        contours, merge_report = merge_strokes(contours, lift_seconds(), retrace_time)
+        print("Stroke merge:", merge_report)
+    if SIMPLIFY_TOLERANCE_STEPS:
+        contours, simplify_report = simplify_contours(
+            contours, SIMPLIFY_TOLERANCE_STEPS, units="steps", method=SIMPLIFY_METHOD,
+            steps_per_pixel=STEPS_PER_PIXEL, time_model=drawing_time, report=SIMPLIFY_REPORT)
+        if simplify_report:
+            print("Simplify:", simplify_report)
+    if ORDER_STROKES:
+        contours, order_report = order_strokes(contours, travel_time=travel_time)
+        print("Stroke order:", order_report)
+    return contours
+
+def plot_image(path):
+    # Headless: plot an image file straight away (with PLOTTER_SIM=1 this
+    # runs in moments and reports how long the real plot would take)
+    frame = cv2.imread(path)
+    if frame is None:
+        print(f"Cannot read {path}")
+        return
+    commands = list(plan_path(prepare_contours(square_crop(frame))))
+    print("Estimate:", estimate_plot(commands))
+    try:
+        for command in commands:
+            run_command(command)
+    finally:
+        cleanup_all()
+    if step_timer is not None:
+        print("Step timing:", step_timer.summary())
+    if simulation is not None:
+        print("Simulated plot:", simulation.summary())
+
+def process_snapshot(frame):
+    # Runs in a SnapshotPipeline worker: camera frame -> contours, commands and estimate.
+    # A frame big enough to tile comes back as a Split instead: its tiles are
+    # thinned on every snapshot worker, then finish_snapshot() carries on.
+    binary = binarize(square_crop(frame))
+    if THIN_TILED and binary.size >= thinning.TILED_MIN_PIXELS:
+        tile = thinning.TILE_SIZE
+        jobs = thinning.tile_jobs(binary, tile)
+        backend = thinning.resolve(THINNING_BACKEND)
+        return Split(thinning.thin, [(job[4], backend) for job in jobs], finish_snapshot,
+                     (binary.shape, [job[:4] for job in jobs], tile))
+    return plan_skeleton(thin(binary))
+
+def finish_snapshot(state, tiles):
+    shape, placements, tile = state
+    return plan_skeleton(thinning.stitch(shape, placements, tiles, tile))
+
+def plan_skeleton(skeleton):
+    contours = prepare_strokes(extract_strokes(skeleton), skeleton.shape[0])
+    commands = list(plan_path(contours))
+    return contours, commands, estimate_plot(commands)
+
+# Overlay the pen-up travel (plotting order) on the snapshot preview
+PREVIEW_TRAVEL = True
+PREVIEW_SECONDS = 3.0
+
+def draw_panel(canvas):
+    # Static part of the side panel, drawn once into the CameraView canvas
+    x1, y1, x2, y2 = button_coords
+    cv2.rectangle(canvas, (x1, y1), (x2, y2), (200, 200, 200), -1)
+    cv2.putText(canvas, "Snapshot", (x1 + 10, y1 + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    cv2.putText(canvas, "w/s: Z  c: contact", (x1, y1 - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+    cv2.putText(canvas, "x: cancel snapshot", (x1, y1 - 40), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+
+# Run motion in a separate process so the preview keeps running while plotting
+USE_MOTION_WORKER = True
+# Process snapshots in worker processes so the preview keeps running meanwhile
+USE_SNAPSHOT_WORKERS = True
+
+def main():
+    global button_clicked
+    motion = None
+    plot_end = None  # estimated finish time of the running plot
+    motion_error = None  # last command the motion worker failed on
+    if USE_MOTION_WORKER:
+        # Start before any camera/GUI state exists so the forked worker doesn't inherit it
+        motion = MotionWorker(run_command, cleanup=cleanup_all)
+        motion.start()
+    snapshots = None
+    tile_pool = None
+    if USE_SNAPSHOT_WORKERS:
+        snapshots = SnapshotPipeline(process_snapshot)
+        snapshots.start()
+    elif THIN_TILED and PROCESS_SIZE ** 2 >= thinning.TILED_MIN_PIXELS:
+        # Inline snapshots tile on a pool forked now, before the camera thread and GUI
+        tile_pool = thinning.start_pool()
+    preview_until = None  # when to close the skeleton preview window
+
+    cv2.namedWindow(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN)
+    cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+    cv2.setMouseCallback(WINDOW_NAME, mouse_callback)
+
+    preview = PreviewRenderer((DISPLAY_SIZE, DISPLAY_SIZE))
+    camera_view = CameraView(DISPLAY_SIZE, BUTTON_WIDTH, draw_panel)
+
+    def start_plot(contours, commands, estimate):
+        # A processed snapshot: show the preview and hand the commands to the motors
+        nonlocal plot_end, preview_until, motion_error
+        cv2.imshow("Skeleton Plot", preview.render(contours, travel=PREVIEW_TRAVEL))
+        print("Estimate:", estimate)
+        if motion is not None:
+            preview_until = time.monotonic() + PREVIEW_SECONDS
+            motion_error = None
+            if motion.idle():
+                plot_end = time.time()
+            plot_end += estimate["total_s"]
+            motion.submit(commands)
+        else:
+            # Inline plotting blocks the loop anyway; show the preview first
+            cv2.waitKey(int(PREVIEW_SECONDS * 1000))
             cv2.destroyWindow("Skeleton Plot")
-
-            # Execute motor movement
-            execute_path(contours)
-            button_clicked = False
-
-finally:
-    cap.release()
-    cv2.destroyAllWindows()
-    cleanup_all()
+            for command in commands:
+                run_command(command)
+
+    fps = 0.0
+    last_frame = time.perf_counter()
+
+    # Frames are grabbed on a background thread; read() returns the newest one
+    cap = LatestFrameCapture(0, size=CAPTURE_SIZE)
+    if not cap.isOpened():
+        print("Camera not available")
+        if motion is not None:
+            motion.close()
+        if snapshots is not None:
+            snapshots.close()
+        return
+
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                continue
+
+            # Crop/resize straight into the persistent canvas; the static panel is restored
+            canvas = camera_view.update(frame)
+            x1, y1, x2, y2 = button_coords
+
+            now = time.perf_counter()
+            fps = 0.9 * fps + 0.1 / max(now - last_frame, 1e-6)
+            last_frame = now
+            cv2.putText(canvas, f"{fps:4.1f} fps", (x1, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            cv2.putText(canvas, f"{cap.dropped} skipped", (x1, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+            if motion is not None:
+                motion.pump()
+                for message in motion.failures():
+                    print("Motion error, plot stopped:", message)
+                    motion_error = message
+                if motion_error is not None:
+                    cv2.putText(canvas, "Motion error", (x1, y2 + 170), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+                if not motion.idle():
+                    done, submitted, waiting = motion.progress()
+                    cv2.putText(canvas, f"Plot {done}/{submitted + waiting}", (x1, y2 + 40),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                    if plot_end is not None:
+                        cv2.putText(canvas, f"ETA {format_eta(max(plot_end - time.time(), 0))}", (x1, y2 + 90),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                    cv2.putText(canvas, "e: STOP", (x1, y2 + 65), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+
+            if snapshots is not None:
+                for ticket, result, error in snapshots.poll():
+                    if error is not None:
+                        print(f"Snapshot {ticket} failed: {error!r}")
+                        continue
+                    start_plot(*result)
+                pending, fraction, elapsed = snapshots.status()
+                if pending:
+                    label = f"Processing {elapsed:3.1f} s" + (f" +{pending - 1}" if pending > 1 else "")
+                    cv2.putText(canvas, label, (x1, y2 + 120), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                    if fraction is not None:
+                        bar_end = x1 + int((x2 - x1) * fraction)
+                        cv2.rectangle(canvas, (x1, y2 + 130), (x2, y2 + 140), (200, 200, 200), 1)
+                        cv2.rectangle(canvas, (x1, y2 + 130), (bar_end, y2 + 140), (200, 200, 200), -1)
+            if preview_until is not None and time.monotonic() > preview_until:
+                cv2.destroyWindow("Skeleton Plot")
+                preview_until = None
+
+            cv2.imshow(WINDOW_NAME, canvas)
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                break
+            if key == ord('e') and motion is not None:
+                motion.emergency_stop()
+                print("Emergency stop")
+            if key == ord('x') and snapshots is not None:
+                for ticket in snapshots.cancel():
+                    print(f"Snapshot {ticket} cancelled")
+
+            # Z calibration: jog the pen onto the paper with w/s, then c saves the contact point
+            z_key = {ord('w'): ("z_jog", -Z_JOG_STEPS), ord('s'): ("z_jog", Z_JOG_STEPS), ord('c'): ("z_calibrate",)}.get(key)
+            if z_key is not None:
+                if motion is not None:
+                    motion.submit([z_key])
+                else:
+                    run_command(z_key)
+
+            if button_clicked:
+                # Newest grabbed frame, not the one on screen (which may be a frame old)
+                fresh, stamp, _ = cap.latest()
+                print(f"Snapshot frame age: {(time.monotonic() - stamp) * 1000:.0f} ms")
+                if snapshots is not None:
+                    # The capture thread reuses its buffers; the worker gets its own copy
+                    print(f"Snapshot {snapshots.submit(fresh.copy())} queued")
+                else:
+                    start_plot(*run_inline(process_snapshot, fresh, tile_pool))
+                button_clicked = False
+
+    finally:
+        if snapshots is not None:
+            snapshots.close()
+        if motion is not None:
+            motion.close()
+        cap.release()
+        cv2.destroyAllWindows()
+        cleanup_all()
+
+if __name__ == "__main__":
+    # python finalfn.py [image]: camera UI, or plot the image file directly
+    if len(sys.argv) > 1:
+        plot_image(sys.argv[1])
+    else:
+        main()
@@ -0,0 +1,90 @@
+# lookahead.py
+#
+# Look-ahead planning for a whole contour. Consecutive pixel moves are merged
+# while they keep the same direction, then every junction gets a maximum
+# cornering speed from the junction-deviation rule (as used by grbl) and a
+# backward/forward pass makes the entry/exit speeds of all segments reachable
+# with the axis accelerations. The contour is then executed as one continuous
+# velocity profile that only slows down where the path actually turns.
+
+import math
+
+from motion_profile import path_profile
+
+JUNCTION_DEVIATION = 2.0  # steps; allowed corner rounding, bigger = faster corners
+
+
+def contour_segments(points, steps_per_pixel):
+    """Turn contour points into (dx, dy) step moves, merging collinear runs."""
+    segments = []
+    last_x, last_y = points[0]
+    for x, y in points[1:]:
+        dx = int((x - last_x) * steps_per_pixel)
+        dy = int((y - last_y) * steps_per_pixel)
+        last_x, last_y = x, y
+        if dx == 0 and dy == 0:
+            continue
+        if segments:
+            px, py = segments[-1]
+            if px * dy == py * dx and px * dx + py * dy > 0:
+                segments[-1] = (px + dx, py + dy)
+                continue
+        segments.append((dx, dy))
+    return segments
+
+
+def junction_velocity(u_prev, u_next, acceleration, deviation=JUNCTION_DEVIATION):
+    """Highest speed (path steps/s) to pass the corner between two unit directions."""
+    cos_theta = -(u_prev[0] * u_next[0] + u_prev[1] * u_next[1])
+    if cos_theta > 0.999999:
+        return 0.0  # full reversal
+    if cos_theta < -0.999999:
+        return math.inf  # straight through
+    sin_half = math.sqrt(0.5 * (1.0 - cos_theta))
+    return math.sqrt(acceleration * deviation * sin_half / (1.0 - sin_half))
+
+
+def plan_contour(points, steps_per_pixel, x_profile, y_profile, deviation=JUNCTION_DEVIATION):
+    """Plan a contour as a list of (x_steps, x_dir, y_steps, y_dir, entry_velocity, exit_velocity).
+
+    Velocities are in major-axis steps/s, ready to pass to moveXY.
+    """
+    segments = contour_segments(points, steps_per_pixel)
+    if not segments:
+        return []
+
+    lengths, units, limits = [], [], []
+    for dx, dy in segments:
+        length = math.hypot(dx, dy)
+        major = max(abs(dx), abs(dy))
+        lengths.append(length)
+        units.append((dx / length, dy / length))
+        # Segment limits in path units (steps along the line)
+        limits.append(path_profile(x_profile, y_profile, abs(dx), abs(dy)).scaled(length / major))
+
+    n = len(segments)
+    entry = [0.0] * (n + 1)  # entry[i] = speed at the start of segment i, entry[n] = final speed
+    entry[0] = limits[0].start_velocity
+    entry[n] = limits[-1].start_velocity
+    for i in range(1, n):
+        prev, cur = limits[i - 1], limits[i]
+        corner = junction_velocity(units[i - 1], units[i], min(prev.acceleration, cur.acceleration), deviation)
+        floor = min(prev.start_velocity, cur.start_velocity)
+        entry[i] = min(max(corner, floor), prev.max_velocity, cur.max_velocity)
+
+    # Backward pass: every segment must be able to slow down to the next junction
+    for i in range(n - 1, -1, -1):
+        entry[i] = min(entry[i], math.sqrt(entry[i + 1] ** 2 + 2 * limits[i].acceleration * lengths[i]))
+    # Forward pass: and to speed up from the previous one
+    for i in range(n):
+        entry[i + 1] = min(entry[i + 1], math.sqrt(entry[i] ** 2 + 2 * limits[i].acceleration * lengths[i]))
+
+    plan = []
+    for i, (dx, dy) in enumerate(segments):
+        to_major = max(abs(dx), abs(dy)) / lengths[i]
+        plan.append((
+            abs(dx), 1 if dx > 0 else 0,
+            abs(dy), 1 if dy > 0 else 0,
+            entry[i] * to_major, entry[i + 1] * to_major,
+        ))
+    return plan
@@ -0,0 +1,162 @@
+# motion_profile.py
+#
+# Per-step timing for stepper moves. A MotionProfile holds the limits of one
+# axis (steps/s, steps/s^2 and optionally steps/s^3); step_intervals() turns a
+# move of N steps into the time between consecutive steps, ramping up from
+# start_velocity, cruising at max_velocity and ramping back down. With
+# jerk=None the ramps are trapezoidal, otherwise they are jerk limited
+# (S-curve).
+
+import math
+
+
+class MotionProfile:
+    def __init__(self, max_velocity=2000.0, acceleration=4000.0, jerk=None, start_velocity=500.0):
+        self.max_velocity = float(max_velocity)
+        self.acceleration = float(acceleration)
+        self.jerk = None if jerk is None else float(jerk)
+        # Speed the motor can start/stop at without ramping (pull-in rate)
+        self.start_velocity = min(float(start_velocity), self.max_velocity)
+
+    def scaled(self, factor):
+        """Same profile expressed in units scaled by factor (e.g. major-axis steps)."""
+        return MotionProfile(
+            self.max_velocity * factor,
+            self.acceleration * factor,
+            None if self.jerk is None else self.jerk * factor,
+            self.start_velocity * factor,
+        )
+
+    def step_intervals(self, steps, entry_velocity=None, exit_velocity=None):
+        """Return a list of `steps` intervals (seconds) between consecutive steps."""
+        if steps <= 0:
+            return []
+
+        v_in = self.start_velocity if entry_velocity is None else entry_velocity
+        v_out = self.start_velocity if exit_velocity is None else exit_velocity
+        v_in = min(max(v_in, self.start_velocity), self.max_velocity)
+        v_out = min(max(v_out, self.start_velocity), self.max_velocity)
+
+        # A short move may not have room to slow down to v_out from v_in
+        v_in = min(v_in, self.reachable_velocity(v_out, steps))
+        v_out = min(v_out, self.reachable_velocity(v_in, steps))
+
+        v_peak = self._peak_velocity(v_in, v_out, steps)
+        accel = _Ramp(v_in, v_peak, self.acceleration, self.jerk)
+        decel = _Ramp(v_out, v_peak, self.acceleration, self.jerk)
+        cruise_distance = max(steps - accel.distance - decel.distance, 0.0)
+        total_time = accel.duration + cruise_distance / v_peak + decel.duration
+
+        def time_at(s):
+            if s <= accel.distance:
+                return accel.time_at(s)
+            if s <= accel.distance + cruise_distance:
+                return accel.duration + (s - accel.distance) / v_peak
+            return total_time - decel.time_at(max(steps - s, 0.0))
+
+        intervals = []
+        last = 0.0
+        for k in range(1, steps + 1):
+            t = time_at(float(k))
+            intervals.append(max(t - last, 0.0))
+            last = t
+        return intervals
+
+    def duration(self, steps, entry_velocity=None, exit_velocity=None):
+        return sum(self.step_intervals(steps, entry_velocity, exit_velocity))
+
+    def reachable_velocity(self, v_from, steps):
+        """Highest speed reachable (or decelerable from) within `steps` starting at v_from."""
+        lo, hi = v_from, self.max_velocity
+        if _Ramp(v_from, hi, self.acceleration, self.jerk).distance <= steps:
+            return hi
+        for _ in range(40):
+            mid = (lo + hi) / 2
+            if _Ramp(v_from, mid, self.acceleration, self.jerk).distance <= steps:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    def _peak_velocity(self, v_in, v_out, steps):
+        def fits(v):
+            return (_Ramp(v_in, v, self.acceleration, self.jerk).distance
+                    + _Ramp(v_out, v, self.acceleration, self.jerk).distance) <= steps
+
+        lo, hi = max(v_in, v_out), self.max_velocity
+        if fits(hi):
+            return hi
+        for _ in range(40):
+            mid = (lo + hi) / 2
+            if fits(mid):
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+
+class _Ramp:
+    # Acceleration from v0 up to v1 as a list of constant-jerk pieces
+    # (duration, jerk, start accel), trapezoidal when jerk is None.
+    def __init__(self, v0, v1, accel, jerk):
+        self.v0 = v0
+        dv = max(v1 - v0, 0.0)
+        if dv == 0.0:
+            self.pieces = []
+        elif jerk is None:
+            self.pieces = [(dv / accel, 0.0, accel)]
+        elif dv >= accel * accel / jerk:
+            t_j = accel / jerk
+            self.pieces = [(t_j, jerk, 0.0), ((dv - accel * t_j) / accel, 0.0, accel), (t_j, -jerk, accel)]
+        else:
+            a_peak = math.sqrt(dv * jerk)
+            t_j = a_peak / jerk
+            self.pieces = [(t_j, jerk, 0.0), (t_j, -jerk, a_peak)]
+
+        # Position/velocity at the start of every piece
+        self.starts = []
+        t = s = 0.0
+        v = v0
+        for duration, j, a in self.pieces:
+            self.starts.append((t, s, v))
+            s += v * duration + a * duration ** 2 / 2 + j * duration ** 3 / 6
+            v += a * duration + j * duration ** 2 / 2
+            t += duration
+        self.duration = t
+        self.distance = s
+
+    def time_at(self, s):
+        if s <= 0.0:
+            return 0.0
+        if s >= self.distance:
+            return self.duration
+        for (duration, j, a), (t0, s0, v0) in zip(reversed(self.pieces), reversed(self.starts)):
+            if s >= s0:
+                break
+        target = s - s0
+        lo, hi = 0.0, duration
+        for _ in range(40):
+            mid = (lo + hi) / 2
+            if v0 * mid + a * mid ** 2 / 2 + j * mid ** 3 / 6 < target:
+                lo = mid
+            else:
+                hi = mid
+        return t0 + (lo + hi) / 2
+
+
+def path_profile(x_profile, y_profile, x_steps, y_steps):
+    """Limits for the major axis of a Bresenham move so neither axis exceeds its own profile."""
+    major = max(x_steps, y_steps)
+    limits = []
+    for profile, steps in ((x_profile, x_steps), (y_profile, y_steps)):
+        if steps:
+            limits.append(profile.scaled(major / steps))
+    if not limits:
+        return x_profile
+    jerks = [p.jerk for p in limits if p.jerk is not None]
+    return MotionProfile(
+        min(p.max_velocity for p in limits),
+        min(p.acceleration for p in limits),
+        min(jerks) if jerks else None,
+        min(p.start_velocity for p in limits),
+    )
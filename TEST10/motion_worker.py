@@ -0,0 +1,158 @@
+# motion_worker.py
+#
+# Runs motion in its own process, away from the OpenCV UI loop. The UI plans
+# a drawing into small picklable commands and submits them; they are fed
+# through a bounded queue to a worker pinned to its own CPU core, which
+# executes them with the same run_command() used for inline drawing.
+#
+# - Back-pressure: submit() never blocks. Commands wait in a local backlog
+#   and pump() (call it once per UI frame) moves as many as fit into the
+#   queue.
+# - Emergency stop: emergency_stop() bumps a shared generation counter. The
+#   running move notices it on its next step (see check_stop()) and every
+#   queued command from the old generation is dropped.
+# - Errors: a command that raises is reported through an error queue and the
+#   rest of its generation is skipped (the plot can't continue from an
+#   unknown position); the worker keeps serving later commands. failures()
+#   (call it once per UI frame) hands the errors to the UI and resets the
+#   progress like an emergency stop.
+
+import collections
+import gc
+import multiprocessing
+import os
+import queue
+import traceback
+
+QUEUE_SIZE = 256
+MOTION_CORE = 3  # the Pi has 4 cores; keep the last one for stepping
+
+_generation = None   # shared generation counter, set inside the worker
+_command_generation = 0
+
+
+class EmergencyStop(Exception):
+    pass
+
+
+def check_stop():
+    # Called by the stepping loops; a no-op outside the worker process
+    if _generation is not None and _generation.value != _command_generation:
+        raise EmergencyStop()
+
+
+class MotionWorker:
+    def __init__(self, run_command, core=MOTION_CORE, queue_size=QUEUE_SIZE, cleanup=None):
+        # fork: the worker inherits the motor objects from the parent.
+        # cleanup() runs in the worker when it exits, as it is the process
+        # that drives (and may have claimed) the GPIO lines.
+        ctx = multiprocessing.get_context("fork")
+        self.commands = ctx.Queue(maxsize=queue_size)
+        self.generation = ctx.Value("i", 0)
+        self.executed = ctx.Value("i", 0)
+        self.stopped = ctx.Value("i", 0)
+        self.errors = ctx.Queue()
+        self.backlog = collections.deque()
+        self.submitted = 0
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(run_command, self.commands, self.generation, self.executed, self.stopped, core, cleanup,
+                  self.errors),
+            daemon=True,
+        )
+
+    def start(self):
+        self.process.start()
+
+    def submit(self, commands):
+        self.backlog.extend(commands)
+        self.pump()
+
+    def pump(self):
+        generation = self.generation.value
+        while self.backlog:
+            try:
+                self.commands.put_nowait((generation, self.backlog[0]))
+            except queue.Full:
+                break
+            self.backlog.popleft()
+            self.submitted += 1
+
+    def emergency_stop(self):
+        with self.generation.get_lock():
+            self.generation.value += 1
+        self.backlog.clear()
+        self.submitted = self.executed.value
+
+    def failures(self):
+        """Error messages of commands that failed since the last call."""
+        messages = []
+        while True:
+            try:
+                messages.append(self.errors.get_nowait())
+            except queue.Empty:
+                break
+        if messages:
+            self.emergency_stop()  # the worker already skips the failed plot
+        return messages
+
+    def progress(self):
+        # (commands executed, commands submitted so far, commands still waiting locally)
+        return self.executed.value, self.submitted, len(self.backlog)
+
+    def idle(self):
+        return not self.backlog and self.executed.value >= self.submitted
+
+    def close(self, timeout=5.0):
+        self.emergency_stop()
+        self.commands.put((self.generation.value, None))
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def _set_realtime(core):
+    try:
+        if core < os.cpu_count():
+            os.sched_setaffinity(0, {core})
+    except (AttributeError, OSError):
+        pass
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(50))
+    except (AttributeError, PermissionError, OSError):
+        pass  # needs root / CAP_SYS_NICE; affinity alone still helps
+    # Commands hold no reference cycles, so GC pauses are pure jitter here
+    gc.freeze()
+    gc.disable()
+
+
+def _worker_main(run_command, commands, generation, executed, stopped, core, cleanup=None, errors=None):
+    global _generation, _command_generation
+    _set_realtime(core)
+    _generation = generation
+    failed_generation = None
+
+    try:
+        while True:
+            command_generation, command = commands.get()
+            if command is None:
+                break
+            if command_generation != generation.value or command_generation == failed_generation:
+                continue  # queued before an emergency stop, or after a failed command
+            _command_generation = command_generation
+            try:
+                run_command(command)
+            except EmergencyStop:
+                stopped.value += 1
+                continue
+            except Exception as exc:
+                traceback.print_exc()
+                failed_generation = command_generation
+                if errors is not None:
+                    errors.put(f"{command[0]}: {exc!r}")
+                continue
+            with executed.get_lock():
+                executed.value += 1
+    finally:
+        if cleanup is not None:
+            cleanup()
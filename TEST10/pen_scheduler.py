@@ -0,0 +1,168 @@
+# pen_scheduler.py
+#
+# Coordinated X/Y/Z timeline for moving between strokes. Instead of
+# "finish the stroke, raise Z, settle, travel, lower Z, settle", the pen
+# change is overlapped with the XY motion:
+#
+#   - Z starts raising `lift_lead` seconds before the last drawing move ends
+#     (while it decelerates),
+#   - XY travel starts as soon as the pen has risen `clearance_steps`,
+#   - Z starts lowering during the approach, timed so the pen reaches the
+#     clearance height exactly when XY arrives, then finishes the descent.
+#
+# Moves come in as step_stream records; the result is a single time-sorted
+# list of (t, step_mask, dir_updates) events that run_timeline() plays with
+# perf_counter deadlines or timeline_to_waveform() hands to a step backend.
+
+import time
+
+import numpy as np
+
+from step_backend import DIR_SETUP_US, STEP_PULSE_US
+from step_stream import DIR_X, DIR_Y
+
+AXIS_X = 1
+AXIS_Y = 2
+AXIS_Z = 4
+
+
+def _xy_events(stream, start):
+    # step_stream masks use the same bits as AXIS_X/AXIS_Y
+    if stream is None or len(stream) == 0:
+        return [], start
+    dt = stream["dt"].astype(np.float64)
+    times = start + np.concatenate(([0.0], np.cumsum(dt)[:-1]))
+    direction = int(stream["dir"][0])
+    dirs = ((AXIS_X, 1 if direction & DIR_X else 0), (AXIS_Y, 1 if direction & DIR_Y else 0))
+    events = [(start, 0, dirs)]
+    events += [(t, step, ()) for t, step in zip(times.tolist(), stream["step"].tolist())]
+    return events, start + float(dt.sum())
+
+
+def _z_events(intervals, start, direction):
+    if len(intervals) == 0:
+        return [], start
+    times = start + np.concatenate(([0.0], np.cumsum(intervals)[:-1]))
+    events = [(start, 0, ((AXIS_Z, direction),))]
+    events += [(t, AXIS_Z, ()) for t in times.tolist()]
+    return events, start + float(np.sum(intervals))
+
+
+def plan_pen_travel(lead, travel, raise_intervals, lower_intervals, clearance_steps,
+                    lift_lead=0.0, lower=True, up_dir=1, down_dir=0):
+    """Timeline for: end of stroke (lead) -> pen up -> travel -> pen down.
+
+    lead/travel: step_stream records (lead may be None)
+    raise_intervals/lower_intervals: time between Z steps going up/down
+    Returns (events, duration) with events sorted by time.
+    """
+    lead_events, lead_end = _xy_events(lead, 0.0)
+
+    raise_start = max(lead_end - lift_lead, 0.0)
+    raise_events, raise_end = _z_events(raise_intervals, raise_start, up_dir)
+    clear = min(clearance_steps, len(raise_intervals))
+    clear_time = raise_start + float(np.sum(raise_intervals[:clear]))
+
+    travel_events, travel_end = _xy_events(travel, max(lead_end, clear_time))
+    events = lead_events + raise_events + travel_events
+    end = max(travel_end, raise_end)
+
+    if lower:
+        # Pen passes the clearance height `clearance_steps` before contact
+        above = max(len(lower_intervals) - clearance_steps, 0)
+        descent_to_clearance = float(np.sum(lower_intervals[:above]))
+        lower_start = max(raise_end, travel_end - descent_to_clearance)
+        lower_events, end = _z_events(lower_intervals, lower_start, down_dir)
+        events += lower_events
+
+    # Direction updates sort before steps at the same instant
+    events.sort(key=lambda e: (e[0], e[1] != 0))
+    return events, end
+
+
+def net_steps(events):
+    """{axis: steps with direction 1 minus steps with direction 0} over a timeline."""
+    position = {}
+    directions = {}
+    for _, step_mask, dir_updates in events:
+        directions.update(dir_updates)
+        _count_steps(position, directions, step_mask)
+    return position
+
+
+def _count_steps(position, directions, step_mask):
+    axis = 1
+    while step_mask:
+        if step_mask & 1:
+            position[axis] = position.get(axis, 0) + (1 if directions.get(axis) else -1)
+        step_mask >>= 1
+        axis <<= 1
+
+
+def run_timeline(events, motors, check=None, position=None, timer=None):
+    """Play a timeline. motors: {AXIS_X: motorX, ...} with set_direction() and step().
+
+    position: dict updated like net_steps() as the steps go out, so it still
+    matches the motors when check() raises part way through.
+    timer: step_timing.EdgeTimer; gets every event that steps, with the
+    planned time until the next one as its requested period.
+    """
+    directions = {}
+    if timer is not None:
+        step_times = [t for t, step_mask, _ in events if step_mask]
+        gaps = iter(np.diff(step_times, append=step_times[-1:]).tolist())
+    start = time.perf_counter()
+    for t, step_mask, dir_updates in events:
+        if check is not None:
+            check()
+        deadline = start + t
+        remaining = deadline - time.perf_counter()
+        if remaining > 0.0002:
+            time.sleep(remaining - 0.0002)
+        while time.perf_counter() < deadline:
+            pass
+        for axis, direction in dir_updates:
+            motors[axis].set_direction(direction)
+            directions[axis] = direction
+        if timer is not None and step_mask:
+            timer.record(time.perf_counter(), next(gaps))
+        mask = step_mask
+        axis = 1
+        while mask:
+            if mask & 1:
+                motors[axis].step()
+            mask >>= 1
+            axis <<= 1
+        if position is not None:
+            _count_steps(position, directions, step_mask)
+
+
+def timeline_to_waveform(events, pins):
+    """pigpio-style pulses for a step backend. pins: {AXIS_X: (dir_pin, step_pin), ...}"""
+    wave = []
+    now_us = 0
+    for t, step_mask, dir_updates in events:
+        at_us = int(round(t * 1e6))
+        on = off = 0
+        for axis, direction in dir_updates:
+            if direction:
+                on |= 1 << pins[axis][0]
+            else:
+                off |= 1 << pins[axis][0]
+        steps = 0
+        for axis, (_, step_pin) in pins.items():
+            if step_mask & axis:
+                steps |= 1 << step_pin
+        if at_us > now_us and wave:
+            # Stretch the previous pulse's gap up to this event
+            last_on, last_off, last_delay = wave[-1]
+            wave[-1] = (last_on, last_off, last_delay + at_us - now_us)
+            now_us = at_us
+        if on or off:
+            wave.append((on, off, DIR_SETUP_US))
+            now_us += DIR_SETUP_US
+        if steps:
+            wave.append((steps, 0, STEP_PULSE_US))
+            wave.append((0, steps, 0))
+            now_us += STEP_PULSE_US
+    return wave
@@ -0,0 +1,99 @@
+# plot_profiler.py
+#
+# Drawing-time estimate for a planned plot, without touching the hardware.
+# It walks the same command tuples plan_path() hands to run_command() and
+# prices each one with a command_duration(command) callback (finalfn.py
+# provides one from its motion profiles, delays and Z timings):
+#
+#   draw    XY moves/streams with the pen down
+#   travel  XY moves with the pen up
+#   pen     Z moves and settling, minus what overlaps with XY travel
+#
+# step_overhead adds a fixed cost per XY step for the GPIO calls on top of
+# the planned step timing (0 for hardware-timed backends).
+
+import math
+import time
+
+
+def _move_steps(command):
+    # ("move", x_steps, x_dir, y_steps, y_dir, v_in, v_out)
+    return command[1], command[3]
+
+
+def _stream_steps(stream):
+    step = stream["step"]
+    x = int((step & 1).astype(bool).sum())
+    y = int((step & 2).astype(bool).sum())
+    both = int(((step & 3) == 3).sum())
+    length = (x + y - 2 * both) + both * math.sqrt(2)
+    return x, y, length
+
+
+def format_eta(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def profile_plot(commands, command_duration, steps_per_pixel, step_overhead=0.0):
+    """Report steps, distances, lifts and per-phase time for a list of commands."""
+    phases = {"draw": 0.0, "travel": 0.0, "pen": 0.0}
+    distance = {"draw": 0.0, "travel": 0.0}
+    steps = 0
+    lifts = 0
+    count = 0
+    pen_down = False
+    started = time.perf_counter()
+
+    def xy_move(command, phase):
+        nonlocal steps
+        x, y = _move_steps(command)
+        seconds = command_duration(command) + step_overhead * (x + y)
+        phases[phase] += seconds
+        distance[phase] += math.hypot(x, y) / steps_per_pixel
+        steps += x + y
+        return seconds
+
+    for command in commands:
+        count += 1
+        kind = command[0]
+        if kind == "move":
+            xy_move(command, "draw" if pen_down else "travel")
+        elif kind == "stream":
+            x, y, length = _stream_steps(command[1])
+            phases["draw"] += command_duration(command) + step_overhead * (x + y)
+            distance["draw"] += length / steps_per_pixel
+            steps += x + y
+        elif kind == "pen_travel":
+            # Overlapped lift: whatever the lead and travel moves don't cover is pen time
+            lead, travel, lower = command[1:]
+            total = command_duration(command)
+            covered = xy_move(lead, "draw") if lead is not None else 0.0
+            covered += xy_move(travel, "travel")
+            phases["pen"] += max(total - covered, 0.0)
+            lifts += 1
+            pen_down = lower
+        else:
+            if kind == "pen_up":
+                lifts += 1
+                pen_down = False
+            elif kind == "pen_down":
+                pen_down = True
+            phases["pen"] += command_duration(command)
+
+    total = sum(phases.values())
+    return {
+        "commands": count,
+        "xy_steps": steps,
+        "pen_down_px": round(distance["draw"], 1),
+        "pen_up_px": round(distance["travel"], 1),
+        "lifts": lifts,
+        "draw_s": round(phases["draw"], 2),
+        "travel_s": round(phases["travel"], 2),
+        "pen_s": round(phases["pen"], 2),
+        "total_s": round(total, 2),
+        "eta": format_eta(total),
+        "estimate_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
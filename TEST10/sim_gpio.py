@@ -0,0 +1,221 @@
+# sim_gpio.py
+#
+# Offline stand-in for the plotter hardware. install() puts fake RPi.GPIO and
+# gpiod (v1 API) modules into sys.modules and swaps time.sleep/perf_counter
+# for a virtual clock, so every StepperMotor variant in the project runs
+# unchanged without a Pi:
+#
+#   - sleeping advances the clock instantly instead of waiting,
+#   - every line transition is recorded as (virtual time, pin, level),
+#   - the clock at the end is the time the same run takes on the hardware
+#     (the sleeps; GPIO call overhead can be charged with call_cost).
+#
+# Select it with PLOTTER_SIM=1 (finalfn.py checks it) or run any script
+# through it:  python sim_gpio.py ../tri.py
+
+import array
+import sys
+import time
+import types
+
+SIM_ENV = "PLOTTER_SIM"
+
+
+class VirtualClock:
+    def __init__(self, call_cost=0.0):
+        self.now = 0.0
+        # Charged on every clock read and GPIO write. A small non-zero cost
+        # also lets busy-wait loops (while perf_counter() < deadline) finish.
+        self.call_cost = call_cost
+        self.tick = max(call_cost, 1e-6)
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+    def perf_counter(self):
+        self.now += self.tick
+        return self.now
+
+
+class Recorder:
+    """Line transitions on the virtual clock. Pins are BCM numbers / gpiod offsets."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.levels = {}
+        self.times = array.array("d")
+        self.pins = array.array("i")
+        self.values = array.array("b")
+
+    def write(self, pin, level):
+        self.clock.now += self.clock.call_cost
+        level = 1 if level else 0
+        if self.levels.get(pin) == level:
+            return
+        self.levels[pin] = level
+        self.times.append(self.clock.now)
+        self.pins.append(pin)
+        self.values.append(level)
+
+    def summary(self):
+        edges = {}
+        for p, v in zip(self.pins, self.values):
+            if v:
+                edges[p] = edges.get(p, 0) + 1
+        return {
+            "duration_s": round(self.clock.now, 3),
+            "transitions": len(self.times),
+            "rising_edges": dict(sorted(edges.items())),
+        }
+
+
+def _rpi_gpio_module(recorder):
+    gpio = types.ModuleType("RPi.GPIO")
+    gpio.BCM = 11
+    gpio.BOARD = 10
+    gpio.OUT = 0
+    gpio.IN = 1
+    gpio.LOW = 0
+    gpio.HIGH = 1
+
+    def setmode(mode):
+        pass
+
+    def setwarnings(flag):
+        pass
+
+    def setup(pins, mode, initial=0, **kwargs):
+        for pin in pins if isinstance(pins, (list, tuple)) else [pins]:
+            if mode == gpio.OUT:
+                recorder.write(pin, initial)
+
+    def output(pins, levels):
+        pins = pins if isinstance(pins, (list, tuple)) else [pins]
+        levels = levels if isinstance(levels, (list, tuple)) else [levels] * len(pins)
+        for pin, level in zip(pins, levels):
+            recorder.write(pin, level)
+
+    def input(pin):
+        return recorder.levels.get(pin, 0)
+
+    def cleanup(pins=None):
+        pass
+
+    for fn in (setmode, setwarnings, setup, output, input, cleanup):
+        setattr(gpio, fn.__name__, fn)
+    rpi = types.ModuleType("RPi")
+    rpi.GPIO = gpio
+    return rpi, gpio
+
+
+def _gpiod_module(recorder):
+    gpiod = types.ModuleType("gpiod")
+    gpiod.LINE_REQ_DIR_IN = 2
+    gpiod.LINE_REQ_DIR_OUT = 3
+
+    class LineBulk:
+        def __init__(self, offsets):
+            self.offsets = list(offsets)
+
+        def request(self, consumer=None, type=None, default_vals=None):
+            if type == gpiod.LINE_REQ_DIR_OUT:
+                self.set_values(default_vals or [0] * len(self.offsets))
+
+        def set_values(self, values):
+            for offset, value in zip(self.offsets, values):
+                recorder.write(offset, value)
+
+        def get_values(self):
+            return [recorder.levels.get(offset, 0) for offset in self.offsets]
+
+        def release(self):
+            pass
+
+    class Line(LineBulk):
+        def __init__(self, offset):
+            super().__init__([offset])
+
+        def set_value(self, value):
+            self.set_values([value])
+
+        def get_value(self):
+            return self.get_values()[0]
+
+    class Chip:
+        def __init__(self, name):
+            self.name = name
+
+        def get_line(self, offset):
+            return Line(offset)
+
+        def get_lines(self, offsets):
+            return LineBulk(offsets)
+
+        def close(self):
+            pass
+
+    gpiod.Chip = Chip
+    return gpiod
+
+
+class Simulation:
+    def __init__(self, clock, recorder):
+        self.clock = clock
+        self.recorder = recorder
+        self._saved_time = None
+        self._saved_modules = {}
+
+    def summary(self):
+        return self.recorder.summary()
+
+    def uninstall(self):
+        for name, module in self._saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        if self._saved_time:
+            time.sleep, time.perf_counter, time.monotonic = self._saved_time
+
+
+def install(call_cost=0.0):
+    """Replace RPi.GPIO, gpiod and the time functions. Call before those modules are imported."""
+    current = getattr(sys.modules.get("RPi.GPIO"), "_simulation", None)
+    if current is not None:
+        return current  # already installed, e.g. by running a script through sim_gpio.py
+    clock = VirtualClock(call_cost)
+    recorder = Recorder(clock)
+    sim = Simulation(clock, recorder)
+
+    rpi, gpio = _rpi_gpio_module(recorder)
+    gpio._simulation = sim
+    for name, module in (("RPi", rpi), ("RPi.GPIO", gpio), ("gpiod", _gpiod_module(recorder))):
+        sim._saved_modules[name] = sys.modules.get(name)
+        sys.modules[name] = module
+
+    sim._saved_time = (time.sleep, time.perf_counter, time.monotonic)
+    time.sleep = clock.sleep
+    time.perf_counter = clock.perf_counter
+    time.monotonic = clock.perf_counter
+    return sim
+
+
+if __name__ == "__main__":
+    import os
+    import runpy
+
+    if len(sys.argv) < 2:
+        print("usage: python sim_gpio.py script.py [args...]")
+        sys.exit(1)
+    script = os.path.abspath(sys.argv[1])
+    sys.argv = sys.argv[1:]
+    sys.path.insert(0, os.path.dirname(script))
+    os.environ[SIM_ENV] = "1"
+    sim = install()
+    started = sim._saved_time[1]()
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        wall = sim._saved_time[1]() - started
+        print("Simulated:", sim.summary(), f"(ran in {wall:.2f} s)")
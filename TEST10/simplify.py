@@ -0,0 +1,154 @@
+# simplify.py
+#
+# Polyline simplification before motion. With CHAIN_APPROX_NONE every
+# skeleton pixel is a contour point and execute_path() issues one move per
+# pixel; collapsing (near-)collinear runs into long segments keeps the shape
+# within a tolerance while cutting the number of moves.
+#
+#   "rdp"          Ramer-Douglas-Peucker: no point of the original line is
+#                  further than the tolerance from the simplified one
+#   "visvalingam"  drops the point with the smallest triangle area until all
+#                  remaining areas exceed tolerance**2 (smoother on curves)
+
+import heapq
+import math
+
+import numpy as np
+
+
+def to_pixels(tolerance, units="px", steps_per_pixel=1, steps_per_mm=None):
+    if units == "px":
+        return tolerance
+    if units == "steps":
+        return tolerance / steps_per_pixel
+    if units == "mm":
+        if not steps_per_mm:
+            raise ValueError("steps_per_mm is needed for a tolerance in mm")
+        return tolerance * steps_per_mm / steps_per_pixel
+    raise ValueError(f"Unknown tolerance units: {units}")
+
+
+def rdp_mask(points, epsilon):
+    """Boolean mask of the points Ramer-Douglas-Peucker keeps."""
+    pts = np.asarray(points, dtype=np.float64)
+    n = len(pts)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last <= first + 1:
+            continue
+        inner = pts[first + 1:last] - pts[first]
+        chord = pts[last] - pts[first]
+        length = math.hypot(chord[0], chord[1])
+        if length == 0.0:
+            # Closed contour: measure from the shared start/end point
+            dist = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dist = np.abs(chord[0] * inner[:, 1] - chord[1] * inner[:, 0]) / length
+        k = int(np.argmax(dist))
+        if dist[k] > epsilon:
+            split = first + 1 + k
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def visvalingam_mask(points, epsilon):
+    """Boolean mask of the points Visvalingam-Whyatt keeps (area threshold epsilon**2)."""
+    pts = np.asarray(points, dtype=np.float64)
+    n = len(pts)
+    keep = np.ones(n, dtype=bool)
+    if n < 3:
+        return keep
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+
+    def area(i):
+        a, b, c = pts[prev[i]], pts[i], pts[nxt[i]]
+        return abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1])) / 2.0
+
+    areas = [math.inf] * n
+    heap = []
+    for i in range(1, n - 1):
+        areas[i] = area(i)
+        heap.append((areas[i], i))
+    heapq.heapify(heap)
+
+    threshold = epsilon * epsilon
+    while heap:
+        a, i = heapq.heappop(heap)
+        if not keep[i] or a != areas[i]:
+            continue  # stale entry
+        if a > threshold:
+            break
+        keep[i] = False
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if 0 < j < n - 1:
+                # A neighbour's area never drops below the removed one (keeps the order)
+                areas[j] = max(area(j), a)
+                heapq.heappush(heap, (areas[j], j))
+    return keep
+
+
+def fixed_delay_move_time(x_steps, y_steps, delay=0.001):
+    # moveXY without a profile: 2 * delay for every pulse on either axis
+    return 2 * delay * (x_steps + y_steps)
+
+
+def drawing_time(contours, steps_per_pixel, move_time=fixed_delay_move_time):
+    """Estimated pen-down time (s) with one fixed-delay move per consecutive point pair."""
+    cache = {}  # the same short pixel moves repeat all over a contour
+    total = 0.0
+    for contour in contours:
+        pts = contour.reshape(-1, 2)
+        steps = (np.abs(np.diff(pts, axis=0)) * steps_per_pixel).astype(np.int64)
+        for move in map(tuple, steps.tolist()):
+            if move not in cache:
+                cache[move] = move_time(*move)
+            total += cache[move]
+    return total
+
+
+def simplify_contours(contours, tolerance, units="px", method="rdp", steps_per_pixel=1,
+                      steps_per_mm=None, time_model=None, report=False):
+    """Simplify OpenCV-style contours (N, 1, 2). Returns (contours, report).
+
+    report is None unless asked for; it prices both versions with
+    time_model(contours) -> s, which should follow how the contours will
+    actually be drawn (default: one fixed-delay move per point pair).
+    """
+    epsilon = to_pixels(tolerance, units, steps_per_pixel, steps_per_mm)
+    mask_fn = {"rdp": rdp_mask, "visvalingam": visvalingam_mask}[method]
+
+    simplified = []
+    for contour in contours:
+        pts = contour.reshape(-1, 2)
+        simplified.append(pts[mask_fn(pts, epsilon)].reshape(-1, 1, 2))
+
+    if not report:
+        return simplified, None
+    if time_model is None:
+        def time_model(c):
+            return drawing_time(c, steps_per_pixel)
+    before = sum(len(c) for c in contours)
+    after = sum(len(c) for c in simplified)
+    time_before = time_model(contours)
+    time_after = time_model(simplified)
+    report = {
+        "method": method,
+        "tolerance_px": round(epsilon, 3),
+        "vertices_before": before,
+        "vertices_after": after,
+        "reduction_ratio": round(before / after, 2) if after else None,
+        "time_before_s": round(time_before, 2),
+        "time_after_s": round(time_after, 2),
+        "time_saved_s": round(time_before - time_after, 2),
+    }
+    return simplified, report
@@ -0,0 +1,93 @@
+# skeleton_graph.py
+#
+# Turns a 1-pixel skeleton into a graph instead of running findContours on
+# it (which traces both sides of every stroke, so lines get drawn twice).
+# Endpoints (1 neighbour) and junctions (3+ neighbours) become nodes and each
+# skeleton edge between them is emitted exactly once as an ordered polyline.
+#
+# Pixels are 8-connected, but a diagonal link is ignored when an orthogonal
+# pixel already joins the two; otherwise every staircase corner would count
+# as a junction.
+
+import numpy as np
+
+# (dy, dx) of the 8 neighbours; bit k of a pixel's link mask = link to OFFSETS[k]
+OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def _link_masks(binary):
+    padded = np.pad(binary, 1)
+    h, w = binary.shape
+
+    def shifted(dy, dx):
+        return padded[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+
+    masks = np.zeros((h, w), dtype=np.uint8)
+    for k, (dy, dx) in enumerate(OFFSETS):
+        link = binary & shifted(dy, dx)
+        if dy and dx:
+            link &= ~(shifted(dy, 0) | shifted(0, dx))
+        masks |= link.astype(np.uint8) << k
+    return masks
+
+
+def skeleton_to_graph(skeleton):
+    """Return (nodes, edges) for a skeleton image (nonzero = skeleton).
+
+    nodes: {(x, y): "end" | "junction"}
+    edges: list of polylines, each a list of (x, y) from one node to another.
+           Closed loops without any node start and end on the same pixel.
+    """
+    binary = np.asarray(skeleton) > 0
+    masks = _link_masks(binary)
+    degree = np.zeros(binary.shape, dtype=np.uint8)
+    for k in range(8):
+        degree += (masks >> k) & 1
+
+    w = binary.shape[1]
+    ys, xs = np.nonzero(binary)
+    links = {}
+    for y, x, mask in zip(ys.tolist(), xs.tolist(), masks[ys, xs].tolist()):
+        links[y * w + x] = [(y + dy) * w + x + dx for k, (dy, dx) in enumerate(OFFSETS) if mask >> k & 1]
+
+    node_ids = [p for p, n in links.items() if len(n) != 2 and n]
+    nodes = {(p % w, p // w): ("end" if len(links[p]) == 1 else "junction") for p in node_ids}
+    is_node = set(node_ids)
+
+    used = set()
+
+    def walk(start, first):
+        path = [start, first]
+        used.add((min(start, first), max(start, first)))
+        current = first
+        while current not in is_node and current != start:
+            step = None
+            for nxt in links[current]:
+                key = (min(current, nxt), max(current, nxt))
+                if key not in used:
+                    used.add(key)
+                    step = nxt
+                    break
+            if step is None:
+                break
+            path.append(step)
+            current = step
+        return [(p % w, p // w) for p in path]
+
+    edges = []
+    for start in node_ids:
+        for first in links[start]:
+            if (min(start, first), max(start, first)) not in used:
+                edges.append(walk(start, first))
+    # Whatever is left are loops made only of degree-2 pixels
+    for start, neighbours in links.items():
+        for first in neighbours:
+            if (min(start, first), max(start, first)) not in used:
+                edges.append(walk(start, first))
+    return nodes, edges
+
+
+def skeleton_strokes(skeleton):
+    """Skeleton edges as OpenCV-style contours (N, 1, 2), a drop-in for findContours."""
+    _, edges = skeleton_to_graph(skeleton)
+    return [np.array(edge, dtype=np.int32).reshape(-1, 1, 2) for edge in edges]
@@ -0,0 +1,168 @@
+# snapshot_worker.py
+#
+# Snapshot processing (skeletonize -> strokes -> plan) in a process pool, so
+# the camera loop keeps rendering while a snapshot is being turned into a
+# drawing. The UI submits frames and gets a ticket back; poll() (call it once
+# per UI frame) hands back finished results in submission order.
+#
+# - Several snapshots can be queued; they run on up to `workers` processes.
+# - A step can return Split(fn, jobs, then, state) to spread work over the
+#   whole pool (e.g. the tiles of a big frame): poll() submits fn(*args) for
+#   every job, and once they are all done then(state, results) continues the
+#   snapshot on a worker. Workers never start pools of their own.
+# - cancel() drops the newest pending snapshot (or all of them). A snapshot
+#   that has not started is removed from the pool; one that is already
+#   running finishes in its worker but its result is discarded.
+# - status() gives what the progress overlay needs: snapshots pending and
+#   how far along the oldest one is, estimated from previous durations. The
+#   durations are timed in the workers, so a snapshot that starts and ends
+#   between two polls still counts with its real length.
+#
+# run_inline() runs the same steps in the calling process, with the Split
+# jobs on a given executor, for when there is no pipeline.
+
+import collections
+import concurrent.futures
+import multiprocessing
+import time
+
+SNAPSHOT_WORKERS = 2  # the Pi has 4 cores; one is kept for the motion worker
+
+
+class Split:
+    """Returned by a processing step: fn(*args) for every args in jobs, then then(state, results)."""
+
+    def __init__(self, fn, jobs, then, state):
+        # fn and then must be module-level functions; everything is pickled to the workers
+        self.fn = fn
+        self.jobs = jobs
+        self.then = then
+        self.state = state
+
+
+def _ready():
+    return True
+
+
+def _timed(step, *args):
+    # Runs in the worker: (start, end, result) on the system-wide monotonic clock
+    started = time.monotonic()
+    result = step(*args)
+    return started, time.monotonic(), result
+
+
+def run_inline(process, frame, executor=None):
+    """process(frame) in this process; Split jobs go to executor, or run here when it is None."""
+    result = process(frame)
+    while isinstance(result, Split):
+        if executor is None:
+            results = [result.fn(*args) for args in result.jobs]
+        else:
+            futures = [executor.submit(result.fn, *args) for args in result.jobs]
+            results = [future.result() for future in futures]
+        result = result.then(result.state, results)
+    return result
+
+
+class _Snapshot:
+    def __init__(self, ticket, future):
+        self.ticket = ticket
+        self.futures = [future]  # the step in flight: one job, or the jobs of a Split
+        self.split = None        # the Split those jobs belong to
+        self.seen_running = None  # when poll() first saw it running (progress overlay)
+        self.started = None      # worker clock at the start of the first step
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.done = False
+
+
+class SnapshotPipeline:
+    def __init__(self, process, workers=SNAPSHOT_WORKERS):
+        # fork: the workers inherit the already imported pipeline modules.
+        # process(frame) must be a module-level function with a picklable result.
+        self.process = process
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+        self.pending = collections.deque()  # _Snapshot, oldest first
+        self.next_ticket = 1
+        self.durations = collections.deque(maxlen=5)
+
+    def start(self):
+        # The pool forks all its workers on the first submit; do that now,
+        # before the camera thread and the GUI exist, and wait until they're up
+        self.pool.submit(_ready).result()
+
+    def submit(self, frame):
+        ticket = self.next_ticket
+        self.next_ticket += 1
+        self.pending.append(_Snapshot(ticket, self.pool.submit(_timed, self.process, frame)))
+        return ticket
+
+    def cancel(self, all=False):
+        """Cancel the newest pending snapshot (all=True: every one); returns the cancelled tickets."""
+        cancelled = []
+        while self.pending:
+            snapshot = self.pending.pop()
+            for future in snapshot.futures:
+                future.cancel()  # fails if it's already running; the result is dropped either way
+            cancelled.append(snapshot.ticket)
+            if not all:
+                break
+        return cancelled
+
+    def _advance(self, snapshot):
+        # Move a snapshot on to its next step once the current one is done
+        while not snapshot.done and all(future.done() for future in snapshot.futures):
+            errors = [future.exception() for future in snapshot.futures if future.exception() is not None]
+            if errors:
+                snapshot.error = errors[0]
+                snapshot.done = True
+            elif snapshot.split is not None:
+                split, snapshot.split = snapshot.split, None
+                results = [future.result() for future in snapshot.futures]
+                snapshot.futures = [self.pool.submit(_timed, split.then, split.state, results)]
+            else:
+                started, finished, result = snapshot.futures[0].result()
+                if snapshot.started is None:
+                    snapshot.started = started
+                if isinstance(result, Split):
+                    snapshot.split = result
+                    snapshot.futures = [self.pool.submit(result.fn, *args) for args in result.jobs]
+                else:
+                    snapshot.result, snapshot.finished, snapshot.done = result, finished, True
+
+    def poll(self):
+        """[(ticket, result, error)] for the snapshots finished since the last call, in order."""
+        now = time.monotonic()
+        for snapshot in self.pending:
+            if snapshot.seen_running is None and any(f.running() or f.done() for f in snapshot.futures):
+                snapshot.seen_running = now
+            self._advance(snapshot)
+        finished = []
+        while self.pending and self.pending[0].done:
+            snapshot = self.pending.popleft()
+            if snapshot.error is None:
+                self.durations.append(snapshot.finished - snapshot.started)
+            finished.append((snapshot.ticket, snapshot.result, snapshot.error))
+        return finished
+
+    def status(self):
+        """(snapshots pending, fraction done of the oldest or None, its elapsed seconds)."""
+        if not self.pending:
+            return 0, None, 0.0
+        started = self.pending[0].seen_running
+        if started is None:
+            return len(self.pending), 0.0, 0.0
+        elapsed = time.monotonic() - started
+        if not self.durations:
+            return len(self.pending), None, elapsed
+        expected = sum(self.durations) / len(self.durations)
+        return len(self.pending), min(elapsed / expected, 0.99), elapsed
+
+    def idle(self):
+        return not self.pending
+
+    def close(self):
+        self.cancel(all=True)
+        self.pool.shutdown(wait=False, cancel_futures=True)
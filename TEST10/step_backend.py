@@ -0,0 +1,143 @@
+# step_backend.py
+#
+# Hardware-timed step generation. Instead of toggling STEP with two
+# time.sleep() calls per step, a whole move is turned into a waveform: a list
+# of (gpio_on_mask, gpio_off_mask, delay_us) pulses, the same layout pigpio's
+# wave_add_generic() takes. The waveform is handed to a backend in one batch:
+#
+#   PigpioWaveBackend    - DMA timed through the pigpio daemon (sudo pigpiod)
+#   SoftwareWaveBackend  - reference replay on perf_counter deadlines, also
+#                          usable with a custom write() for tests/recording
+
+import time
+
+STEP_PULSE_US = 5   # STEP high time, well above the MP6500 minimum
+DIR_SETUP_US = 5    # DIR must settle before the first STEP edge
+
+
+def build_waveform(dir_levels, steps, pulse_us=STEP_PULSE_US):
+    """Turn a planned move into pigpio style pulses.
+
+    dir_levels: {dir_pin: 0/1} set once before stepping
+    steps: iterable of (step_pins, interval_s), the pins that step together
+           and the time until the next step
+    """
+    wave = []
+    dir_on = dir_off = 0
+    for pin, level in dir_levels.items():
+        if level:
+            dir_on |= 1 << pin
+        else:
+            dir_off |= 1 << pin
+    wave.append((dir_on, dir_off, DIR_SETUP_US))
+
+    for step_pins, interval in steps:
+        mask = 0
+        for pin in step_pins:
+            mask |= 1 << pin
+        low_us = max(int(round(interval * 1e6)) - pulse_us, pulse_us)
+        wave.append((mask, 0, pulse_us))
+        wave.append((0, mask, low_us))
+    return wave
+
+
+def waveform_duration(wave):
+    return sum(delay for _, _, delay in wave) / 1e6
+
+
+class SoftwareWaveBackend:
+    """Replays a waveform in Python against absolute deadlines (no drift between steps)."""
+
+    def __init__(self, write=None, busy_wait_us=200):
+        # write(on_mask, off_mask); defaults to RPi.GPIO outputs
+        self.write = write or _gpio_write
+        self.busy_wait_us = busy_wait_us
+        self.last_wave = None
+
+    def run(self, wave):
+        self.last_wave = wave
+        deadline = time.perf_counter()
+        for on_mask, off_mask, delay_us in wave:
+            self.write(on_mask, off_mask)
+            deadline += delay_us / 1e6
+            remaining = deadline - time.perf_counter()
+            # Sleep the coarse part, spin the last bit for accurate edges
+            if remaining > self.busy_wait_us / 1e6:
+                time.sleep(remaining - self.busy_wait_us / 1e6)
+            while time.perf_counter() < deadline:
+                pass
+
+
+class PigpioWaveBackend:
+    """Sends waveforms through pigpio's DMA engine; timing is independent of Python."""
+
+    MAX_PULSES_PER_WAVE = 2000
+
+    def __init__(self, host="localhost", port=8888):
+        import pigpio
+
+        self.pigpio = pigpio
+        self.pi = pigpio.pi(host, port)
+        if not self.pi.connected:
+            raise RuntimeError("pigpio daemon not running (start it with: sudo pigpiod)")
+        self.configured = set()
+
+    def _setup_pins(self, wave):
+        used = 0
+        for on_mask, off_mask, _ in wave:
+            used |= on_mask | off_mask
+        pin = 0
+        while used:
+            if used & 1 and pin not in self.configured:
+                self.pi.set_mode(pin, self.pigpio.OUTPUT)
+                self.configured.add(pin)
+            used >>= 1
+            pin += 1
+
+    def run(self, wave):
+        self._setup_pins(wave)
+        self.pi.wave_clear()
+        # Stream the move in chunks: each one is sent in SYNC mode so it
+        # starts exactly when the previous one finishes. At most two chunks
+        # (one playing, one waiting) hold DMA memory at any time.
+        queued = []
+        for start in range(0, len(wave), self.MAX_PULSES_PER_WAVE):
+            if len(queued) == 2:
+                while self.pi.wave_tx_at() == queued[0]:
+                    time.sleep(0.001)
+                self.pi.wave_delete(queued.pop(0))
+            chunk = wave[start:start + self.MAX_PULSES_PER_WAVE]
+            self.pi.wave_add_generic([self.pigpio.pulse(*p) for p in chunk])
+            wave_id = self.pi.wave_create()
+            self.pi.wave_send_using_mode(wave_id, self.pigpio.WAVE_MODE_ONE_SHOT_SYNC)
+            queued.append(wave_id)
+        while self.pi.wave_tx_busy():
+            time.sleep(0.001)
+        for wave_id in queued:
+            self.pi.wave_delete(wave_id)
+
+    def close(self):
+        self.pi.stop()
+
+
+def _gpio_write(on_mask, off_mask):
+    import RPi.GPIO as GPIO
+
+    for mask, level in ((on_mask, GPIO.HIGH), (off_mask, GPIO.LOW)):
+        pin = 0
+        while mask:
+            if mask & 1:
+                GPIO.output(pin, level)
+            mask >>= 1
+            pin += 1
+
+
+def make_backend(name):
+    """Backend by name: None (plain sleep pulses), "software" or "pigpio"."""
+    if name is None:
+        return None
+    if name == "software":
+        return SoftwareWaveBackend()
+    if name == "pigpio":
+        return PigpioWaveBackend()
+    raise ValueError(f"Unknown step backend: {name}")
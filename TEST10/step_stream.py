@@ -0,0 +1,90 @@
+# step_stream.py
+#
+# Vectorized Bresenham/DDA. A whole polyline is turned into an array of
+# (step mask, direction mask, dt) records ahead of time, one record per step
+# of each move's major axis, so the output loop only replays the array.
+# The step pattern is exactly the one moveXY's Bresenham loop produces
+# (test_step_stream.py runs the moveXY implementations on the simulated
+# lines and compares their STEP/DIR edges with the stream).
+
+import numpy as np
+
+STEP_X = 1
+STEP_Y = 2
+DIR_X = 1
+DIR_Y = 2
+
+RECORD = np.dtype([("step", np.uint8), ("dir", np.uint8), ("dt", np.float32)])
+
+
+def moves_to_stream(x_steps, x_dir, y_steps, y_dir, delay=0.001, intervals=None):
+    """Records for a batch of moveXY(x_steps, x_dir, y_steps, y_dir) calls (arrays, one entry per move).
+
+    dt follows moveXY's fixed-delay timing (2 * delay per motor pulsed) unless
+    `intervals` gives one dt per record, e.g. from profile_intervals().
+    """
+    x_steps = np.asarray(x_steps, dtype=np.int64)
+    y_steps = np.asarray(y_steps, dtype=np.int64)
+    x_dir = np.broadcast_to(np.asarray(x_dir, dtype=np.uint8), x_steps.shape)
+    y_dir = np.broadcast_to(np.asarray(y_dir, dtype=np.uint8), y_steps.shape)
+
+    # moveXY takes x as the major axis only when it is strictly longer
+    x_major = x_steps > y_steps
+    n_major = np.where(x_major, x_steps, y_steps)
+    n_minor = np.where(x_major, y_steps, x_steps)
+
+    move = np.repeat(np.arange(len(n_major)), n_major)
+    first = np.cumsum(n_major) - n_major
+    i = np.arange(len(move), dtype=np.int64) - first[move] + 1
+    major = n_major[move]
+    minor = n_minor[move]
+
+    # After i major steps Bresenham (err starting at major/2) has taken
+    # ceil((2*i*minor - major) / (2*major)) minor steps
+    taken = np.maximum(-((major - 2 * i * minor) // (2 * major)), 0)
+    taken_before = np.maximum(-((major - 2 * (i - 1) * minor) // (2 * major)), 0)
+    minor_step = taken > taken_before
+
+    xm = x_major[move]
+    stream = np.empty(len(move), dtype=RECORD)
+    stream["step"] = (np.where(xm, STEP_X, STEP_Y)
+                      | np.where(minor_step, np.where(xm, STEP_Y, STEP_X), 0))
+    stream["dir"] = x_dir[move] * DIR_X | y_dir[move] * DIR_Y
+    if intervals is None:
+        stream["dt"] = np.where(minor_step, 4 * delay, 2 * delay)
+    else:
+        stream["dt"] = intervals
+    return stream
+
+
+def polyline_to_stream(points, steps_per_pixel, delay=0.001, x_profile=None, y_profile=None):
+    """Records for drawing a polyline of pixel points with one moveXY per point pair."""
+    points = np.asarray(points).reshape(-1, 2)
+    deltas = np.diff(points, axis=0)
+    steps = (np.abs(deltas) * steps_per_pixel).astype(np.int64)
+    dirs = (deltas > 0).astype(np.uint8)
+    intervals = None
+    if x_profile and y_profile:
+        intervals = profile_intervals(steps[:, 0], steps[:, 1], x_profile, y_profile)
+    return moves_to_stream(steps[:, 0], dirs[:, 0], steps[:, 1], dirs[:, 1], delay, intervals)
+
+
+def profile_intervals(x_steps, y_steps, x_profile, y_profile):
+    """Per-record dt for a batch of moves, each ramping with the axis profiles."""
+    from motion_profile import path_profile
+
+    cache = {}  # pixel contours repeat the same few moves over and over
+    parts = []
+    for dx, dy in zip(x_steps.tolist(), y_steps.tolist()):
+        key = (dx, dy)
+        if key not in cache:
+            cache[key] = path_profile(x_profile, y_profile, dx, dy).step_intervals(max(dx, dy))
+        parts.append(cache[key])
+    if not parts:
+        return np.empty(0)
+    return np.concatenate([np.asarray(p, dtype=np.float64) for p in parts])
+
+
+def stream_duration(stream):
+    return float(stream["dt"].sum(dtype=np.float64))
+
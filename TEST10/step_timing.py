@@ -0,0 +1,78 @@
+# step_timing.py
+#
+# Optional timing instrumentation for StepperMotor.pulse() and the
+# pen-travel timelines (pen_scheduler.run_timeline()). Every step stores
+# the time of its rising STEP edge and its requested period into
+# preallocated ring buffers (no allocation per step). A step's actual period
+# is the time from its edge to the next one (to end() for the last), so the
+# loop and bookkeeping time between pulses is counted too. At the end of a
+# move the edges since begin() are summarised: achieved step rate, jitter
+# percentiles (actual - requested) and overruns, i.e. steps that took more
+# than OVERRUN_US longer than asked, which is where the Pi can't keep up.
+
+import time
+
+import numpy as np
+
+RING_SIZE = 1 << 16   # edges kept; longer moves are summarised over the last RING_SIZE
+OVERRUN_US = 100
+
+
+class EdgeTimer:
+    def __init__(self, size=RING_SIZE, overrun_us=OVERRUN_US):
+        self.size = size
+        self.overrun = overrun_us / 1e6
+        self.requested = np.zeros(size, dtype=np.float64)
+        self.edges = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.move_start = 0
+        self.moves = 0
+        self.totals = {"steps": 0, "overruns": 0, "worst_jitter_us": 0.0}
+
+    def record(self, edge, requested):
+        # edge: perf_counter() at the rising STEP edge
+        i = self.count % self.size
+        self.edges[i] = edge
+        self.requested[i] = requested
+        self.count += 1
+
+    def begin(self):
+        self.move_start = self.count
+
+    def _window(self):
+        n = min(self.count - self.move_start, self.size)
+        end = self.count % self.size
+        if n <= end:
+            return self.requested[end - n:end], self.edges[end - n:end]
+        idx = np.arange(end - n, end) % self.size
+        return self.requested[idx], self.edges[idx]
+
+    def end(self):
+        """Summary of the edges since begin(); also added to the running totals."""
+        finished = time.perf_counter()
+        requested, edges = self._window()
+        if not len(edges):
+            return None
+        actual = np.diff(edges, append=finished)
+        jitter_us = (actual - requested) * 1e6
+        p50, p95, p99 = np.percentile(jitter_us, [50, 95, 99])
+        overruns = int((jitter_us > self.overrun * 1e6).sum())
+        report = {
+            "steps": len(actual),
+            "step_rate": round(len(actual) / float(actual.sum()), 1),
+            "requested_rate": round(len(actual) / float(requested.sum()), 1) if requested.sum() else None,
+            "jitter_p50_us": round(float(p50), 1),
+            "jitter_p95_us": round(float(p95), 1),
+            "jitter_p99_us": round(float(p99), 1),
+            "jitter_max_us": round(float(jitter_us.max()), 1),
+            "overruns": overruns,
+        }
+        self.moves += 1
+        self.totals["steps"] += len(actual)
+        self.totals["overruns"] += overruns
+        self.totals["worst_jitter_us"] = max(self.totals["worst_jitter_us"], report["jitter_max_us"])
+        self.move_start = self.count
+        return report
+
+    def summary(self):
+        return dict(self.totals, moves=self.moves)
@@ -0,0 +1,222 @@
+# stroke_merge.py
+#
+# Chains connected strokes into as few pen-down walks as possible. The
+# strokes are treated as edges of a graph whose vertices are their end
+# points (skeleton_graph edges share their junction pixels exactly). In every
+# connected component:
+#
+# - a component with 2k odd-degree vertices needs max(1, k) walks (Euler);
+# - pairs of odd vertices are joined by retracing the shortest existing path
+#   between them whenever drawing that path again costs less than a pen
+#   lift, which takes one walk off;
+# - the remaining odd vertices are paired with virtual edges, an Euler
+#   circuit is found (Hierholzer) and cut at the virtual edges into walks.
+
+import heapq
+import math
+
+import numpy as np
+
+
+def _polyline_length(points):
+    d = np.diff(np.asarray(points, dtype=np.float64), axis=0)
+    return float(np.hypot(d[:, 0], d[:, 1]).sum())
+
+
+class _Graph:
+    def __init__(self):
+        self.vertex_ids = {}
+        self.vertices = []
+        self.edges = []   # (u, v, points or None for virtual, length)
+        self.adj = []
+
+    def vertex(self, point):
+        if point not in self.vertex_ids:
+            self.vertex_ids[point] = len(self.vertices)
+            self.vertices.append(point)
+            self.adj.append([])
+        return self.vertex_ids[point]
+
+    def add_edge(self, u, v, points, length):
+        eid = len(self.edges)
+        self.edges.append((u, v, points, length))
+        self.adj[u].append((eid, v))
+        self.adj[v].append((eid, u))
+        return eid
+
+
+def _components(graph):
+    seen = [False] * len(graph.vertices)
+    components = []
+    for start in range(len(graph.vertices)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        stack, members = [start], []
+        while stack:
+            v = stack.pop()
+            members.append(v)
+            for _, w in graph.adj[v]:
+                if not seen[w]:
+                    seen[w] = True
+                    stack.append(w)
+        components.append(members)
+    return components
+
+
+def _shortest_paths(graph, source):
+    dist = {source: 0.0}
+    via = {}
+    heap = [(0.0, source)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue
+        for eid, w in graph.adj[v]:
+            nd = d + graph.edges[eid][3]
+            if nd < dist.get(w, math.inf):
+                dist[w] = nd
+                via[w] = (eid, v)
+                heapq.heappush(heap, (nd, w))
+    return dist, via
+
+
+def _euler_walks(graph, component, edge_ids):
+    # Hierholzer on the given edges; returns the circuit as [(eid, from_vertex), ...]
+    allowed = set(edge_ids)
+    used = set()
+    pointer = {v: 0 for v in component}
+    start = next(v for v in component if any(eid in allowed for eid, _ in graph.adj[v]))
+    stack = [(start, None)]
+    circuit = []
+    while stack:
+        v, arrived_by = stack[-1]
+        adj = graph.adj[v]
+        while pointer[v] < len(adj):
+            eid, w = adj[pointer[v]]
+            pointer[v] += 1
+            if eid in allowed and eid not in used:
+                used.add(eid)
+                stack.append((w, (eid, v)))
+                break
+        else:
+            stack.pop()
+            if arrived_by is not None:
+                circuit.append(arrived_by)
+    circuit.reverse()
+    return circuit
+
+
+def _walk_points(graph, steps):
+    points = []
+    for eid, from_vertex in steps:
+        u, v, edge_points, _ = graph.edges[eid]
+        if graph.vertices[from_vertex] != tuple(edge_points[0]):
+            edge_points = edge_points[::-1]
+        points.extend(edge_points if not points else edge_points[1:])
+    return points
+
+
+def _path_points(graph, path, start):
+    # Polyline along edge ids `path`, starting at vertex `start`
+    points = [graph.vertices[start]]
+    v = start
+    for eid in path:
+        u, w, edge_points, _ = graph.edges[eid]
+        points.extend(edge_points[1:] if u == v else edge_points[-2::-1])
+        v = w if u == v else u
+    return points
+
+
+def merge_strokes(contours, lift_seconds, draw_time):
+    """Chain strokes into pen-down walks. Returns (walks as contours, report).
+
+    lift_seconds: time one pen lift costs (up, settle, down, settle)
+    draw_time: draw_time(points) -> seconds to draw the polyline [(x, y), ...]
+               with the pen down, to price retraced paths
+    """
+    graph = _Graph()
+    for contour in contours:
+        points = [tuple(p) for p in contour.reshape(-1, 2).tolist()]
+        if len(points) < 2:
+            continue
+        u = graph.vertex(points[0])
+        v = graph.vertex(points[-1])
+        graph.add_edge(u, v, points, _polyline_length(points))
+    strokes = len(graph.edges)
+
+    retraced_px = 0.0
+    retraced_time = 0.0
+    walks = []
+    for component in _components(graph):
+        edge_ids = {eid for v in component for eid, _ in graph.adj[v]}
+        if not edge_ids:
+            continue
+        odd = [v for v in component if len(graph.adj[v]) % 2]
+
+        # Retrace the cheapest paths between odd vertices while that beats a lift
+        if len(odd) > 2:
+            candidates = []
+            paths = {}
+            for a in odd:
+                dist, via = _shortest_paths(graph, a)
+                paths[a] = via
+                for b in odd:
+                    if b > a and b in dist:
+                        candidates.append((dist[b], a, b))
+            candidates.sort()
+            unmatched = set(odd)
+            for length, a, b in candidates:
+                if len(unmatched) <= 2:
+                    break
+                if a not in unmatched or b not in unmatched:
+                    continue
+                path = []
+                v = b
+                while v != a:
+                    eid, prev = paths[a][v]
+                    path.append(eid)
+                    v = prev
+                retrace = draw_time(_path_points(graph, path, b))
+                if retrace >= lift_seconds:
+                    continue
+                unmatched -= {a, b}
+                retraced_px += length
+                retraced_time += retrace
+                for eid in path:
+                    u, w, points, edge_length = graph.edges[eid]
+                    edge_ids.add(graph.add_edge(u, w, points, edge_length))
+            odd = sorted(unmatched)
+
+        # Pair what is left with virtual edges, then cut the circuit at them
+        virtual = set()
+        for a, b in zip(odd[0::2], odd[1::2]):
+            eid = graph.add_edge(a, b, None, 0.0)
+            virtual.add(eid)
+            edge_ids.add(eid)
+        circuit = _euler_walks(graph, component, edge_ids)
+        if virtual:
+            first = next(i for i, (eid, _) in enumerate(circuit) if eid in virtual)
+            circuit = circuit[first + 1:] + circuit[:first + 1]
+        walk = []
+        for step in circuit:
+            if step[0] in virtual:
+                if walk:
+                    walks.append(walk)
+                walk = []
+            else:
+                walk.append(step)
+        if walk:
+            walks.append(walk)
+
+    merged = [np.array(_walk_points(graph, w), dtype=np.int32).reshape(-1, 1, 2) for w in walks]
+    saved = (strokes - len(merged)) * lift_seconds - retraced_time
+    report = {
+        "pen_lifts_before": strokes,
+        "pen_lifts_after": len(merged),
+        "retraced_px": round(retraced_px, 1),
+        "lift_overhead_before_s": round(strokes * lift_seconds, 1),
+        "lift_overhead_after_s": round(len(merged) * lift_seconds, 1),
+        "projected_saving_s": round(saved, 1),
+    }
+    return merged, report
@@ -0,0 +1,166 @@
+# stroke_order.py
+#
+# Reorders strokes (contours) to cut pen-up travel. A nearest-neighbour tour
+# starting at the origin picks, at every step, the closest free stroke
+# endpoint through a uniform grid index (so it stays fast with thousands of
+# strokes) and enters the stroke from that end. A windowed 2-opt pass then
+# reverses runs of strokes, flipping their direction, whenever that shortens
+# the travel. The tour ends back at the origin, like execute_path().
+
+import math
+
+import numpy as np
+
+GRID_CELL = 32         # px, grid index cell size
+TWO_OPT_WINDOW = 40    # strokes; how far apart the two cut points may be
+TWO_OPT_PASSES = 5
+
+
+def _dist(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def _ends(contour):
+    points = contour.reshape(-1, 2)
+    return (int(points[0][0]), int(points[0][1])), (int(points[-1][0]), int(points[-1][1]))
+
+
+def pen_up_moves(contours, origin=(0, 0)):
+    """(dx, dy) in px of every pen-up move for drawing contours in order, from and back to origin."""
+    position = origin
+    for contour in contours:
+        start, end = _ends(contour)
+        yield start[0] - position[0], start[1] - position[1]
+        position = end
+    yield origin[0] - position[0], origin[1] - position[1]
+
+
+def pen_up_distance(contours, origin=(0, 0)):
+    """Pen-up travel (px) for drawing contours in order, from and back to origin."""
+    return sum(math.hypot(dx, dy) for dx, dy in pen_up_moves(contours, origin))
+
+
+class _GridIndex:
+    # Endpoints bucketed by grid cell; nearest() searches rings of cells outwards
+    def __init__(self, points, cell=GRID_CELL):
+        self.cell = cell
+        self.points = points
+        self.buckets = {}
+        for i, (x, y) in enumerate(points):
+            self.buckets.setdefault((x // cell, y // cell), set()).add(i)
+        self.size = len(points)
+        if points:
+            cells = list(self.buckets)
+            self.max_ring = max(max(abs(cx), abs(cy)) for cx, cy in cells) * 2 + 2
+        else:
+            self.max_ring = 0
+
+    def remove(self, i):
+        x, y = self.points[i]
+        bucket = self.buckets[(x // self.cell, y // self.cell)]
+        bucket.discard(i)
+        self.size -= 1
+
+    def nearest(self, x, y):
+        cx, cy = int(x) // self.cell, int(y) // self.cell
+        best, best_d = None, math.inf
+        ring = 0
+        while self.size and ring <= self.max_ring + abs(cx) + abs(cy):
+            # Anything in this ring or beyond is at least (ring - 1) cells away
+            if best is not None and (ring - 1) * self.cell > best_d:
+                break
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in (range(cy - ring, cy + ring + 1) if abs(gx - cx) == ring else (cy - ring, cy + ring)):
+                    for i in self.buckets.get((gx, gy), ()):
+                        d = _dist((x, y), self.points[i])
+                        if d < best_d:
+                            best, best_d = i, d
+            ring += 1
+        return best
+
+
+def _nearest_neighbour(ends, origin):
+    # Endpoint 2k is the start of stroke k, 2k + 1 its end
+    points = [p for pair in ends for p in pair]
+    index = _GridIndex(points)
+    tour = []
+    position = origin
+    for _ in range(len(ends)):
+        i = index.nearest(*position)
+        stroke, reverse = divmod(i, 2)
+        index.remove(2 * stroke)
+        index.remove(2 * stroke + 1)
+        tour.append((stroke, bool(reverse)))
+        position = ends[stroke][0] if reverse else ends[stroke][1]
+    return tour
+
+
+def _two_opt(tour, ends, origin, window=TWO_OPT_WINDOW, passes=TWO_OPT_PASSES):
+    def start(k):
+        stroke, reverse = tour[k]
+        return ends[stroke][1] if reverse else ends[stroke][0]
+
+    def end(k):
+        stroke, reverse = tour[k]
+        return ends[stroke][0] if reverse else ends[stroke][1]
+
+    n = len(tour)
+    for _ in range(passes):
+        improved = False
+        for i in range(n):
+            before = end(i - 1) if i > 0 else origin
+            for j in range(i, min(n, i + window)):
+                after = start(j + 1) if j + 1 < n else origin
+                # Reversing tour[i..j] swaps which stroke ends touch the neighbours
+                delta = (_dist(before, end(j)) + _dist(start(i), after)
+                         - _dist(before, start(i)) - _dist(end(j), after))
+                if delta < -1e-9:
+                    tour[i:j + 1] = [(stroke, not reverse) for stroke, reverse in reversed(tour[i:j + 1])]
+                    improved = True
+        if not improved:
+            break
+    return tour
+
+
+def order_strokes(contours, origin=(0, 0), travel_time=None):
+    """Return (reordered contours, report). Strokes may come back reversed.
+
+    report has the stroke count and pen-up travel before/after in px, plus
+    the estimated time saved when travel_time(dx, dy) (seconds for a pen-up
+    move of dx, dy px) is given.
+    """
+    strokes = [c for c in contours if len(c) >= 1]
+    before = pen_up_distance(strokes, origin)
+    ends = [_ends(c) for c in strokes]
+
+    tour = _nearest_neighbour(ends, origin)
+    tour = _two_opt(tour, ends, origin)
+    ordered = [strokes[k][::-1] if reverse else strokes[k] for k, reverse in tour]
+
+    after = pen_up_distance(ordered, origin)
+    report = {
+        "strokes": len(strokes),
+        "pen_up_before_px": round(before, 1),
+        "pen_up_after_px": round(after, 1),
+        "pen_up_saved_px": round(before - after, 1),
+    }
+    if travel_time is not None:
+        saved = (sum(travel_time(dx, dy) for dx, dy in pen_up_moves(strokes, origin))
+                 - sum(travel_time(dx, dy) for dx, dy in pen_up_moves(ordered, origin)))
+        report["saved_seconds"] = round(saved, 2)
+    return ordered, report
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(1)
+    contours = []
+    for _ in range(3000):
+        x, y = rng.integers(0, 480, size=2)
+        length = rng.integers(2, 20)
+        pts = np.array([(x + k, y) for k in range(length)], dtype=np.int32)
+        contours.append(pts.reshape(-1, 1, 2))
+    t0 = time.perf_counter()
+    ordered, report = order_strokes(contours)
+    print(report, f"{time.perf_counter() - t0:.2f} s")
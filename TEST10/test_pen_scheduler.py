@@ -0,0 +1,63 @@
+# test_pen_scheduler.py
+
+import numpy as np
+import pytest
+
+import finalfn
+from motion_worker import EmergencyStop
+from pen_scheduler import AXIS_X, AXIS_Z, net_steps, plan_pen_travel
+from step_stream import moves_to_stream
+
+
+def _z_steps(events):
+    return sum(1 for _, mask, _ in events if mask & AXIS_Z)
+
+
+def test_zero_lift_steps_plan_no_z_steps():
+    travel = moves_to_stream([10], [1], [4], [0])
+    events, duration = plan_pen_travel(None, travel, [], [], 0)
+    assert _z_steps(events) == 0
+    assert sum(1 for _, mask, _ in events if mask & AXIS_X) == 10
+    assert duration == pytest.approx(float(travel["dt"].sum()))
+
+
+def test_lift_and_lower_cancel_out():
+    lift = [0.002] * 30
+    events, _ = plan_pen_travel(moves_to_stream([5], [1], [5], [1]), moves_to_stream([20], [0], [3], [1]),
+                                lift, lift, 10, up_dir=1, down_dir=0)
+    assert _z_steps(events) == 60
+    assert net_steps(events).get(AXIS_Z, 0) == 0
+    events, _ = plan_pen_travel(None, moves_to_stream([20], [0], [3], [1]), lift, lift, 10, lower=False)
+    assert net_steps(events)[AXIS_Z] == 30
+
+
+def test_pen_travel_tracks_z_through_an_emergency_stop(monkeypatch):
+    finalfn.acquire_hardware()
+    monkeypatch.setattr(finalfn, "z_contact", 80)
+    monkeypatch.setattr(finalfn, "z_position", 80)
+    events, _ = finalfn.plan_travel_timeline(None, finalfn.move_command(40, 30))
+    calls = []
+    stop_at = 50
+
+    def check_stop():
+        calls.append(1)
+        if len(calls) > stop_at:
+            raise EmergencyStop()
+
+    monkeypatch.setattr(finalfn, "check_stop", check_stop)
+    with pytest.raises(EmergencyStop):
+        finalfn.pen_travel(None, finalfn.move_command(40, 30))
+    raised = net_steps(events[:stop_at]).get(AXIS_Z, 0)
+    assert raised > 0
+    assert finalfn.z_position == 80 - raised
+
+    # Homing from there drives Z exactly back to the start-up position
+    monkeypatch.setattr(finalfn, "check_stop", lambda: None)
+    z_pin = finalfn.motorZ.step_pin
+    recorder = finalfn.simulation.recorder
+    before = len(recorder.times)
+    finalfn.z_home()
+    edges = np.count_nonzero((np.frombuffer(recorder.pins, dtype=np.int32)[before:] == z_pin)
+                             & (np.frombuffer(recorder.values, dtype=np.int8)[before:] == 1))
+    assert edges == 80 - raised
+    assert finalfn.z_position == 0
@@ -0,0 +1,26 @@
+# test_snapshot_worker.py
+
+import concurrent.futures
+import time
+
+import pytest
+
+from snapshot_worker import SnapshotPipeline
+
+
+def _slow_square(x):
+    time.sleep(0.25)
+    return x * x
+
+
+def test_duration_is_timed_in_the_worker():
+    pipeline = SnapshotPipeline(_slow_square, workers=1)
+    pipeline.start()
+    try:
+        ticket = pipeline.submit(7)
+        # Starts and finishes without a poll in between
+        concurrent.futures.wait([pipeline.pending[0].futures[0]])
+        assert pipeline.poll() == [(ticket, 49, None)]
+        assert list(pipeline.durations) == [pytest.approx(0.25, abs=1e-3)]
+    finally:
+        pipeline.close()
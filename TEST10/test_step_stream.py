@@ -0,0 +1,103 @@
+# test_step_stream.py
+#
+# moves_to_stream() against the moveXY implementations it replaces: each
+# moveXY runs on the simulated lines and the recorded STEP/DIR edges must
+# be the ones the stream describes, in the same order.
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+import finalfn
+from motion_profile import path_profile
+from step_stream import DIR_X, DIR_Y, STEP_X, STEP_Y, moves_to_stream
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every moveXY in the project uses X dir 12 / step 16 and Y dir 13 / step 6
+STEP_PINS = {16: STEP_X, 6: STEP_Y}
+DIR_PINS = {12: DIR_X, 13: DIR_Y}
+
+MOVES = [(0, 0), (1, 0), (0, 1), (1, 1), (3, 3), (7, 3), (3, 7), (200, 1), (1, 200), (5, 4), (4, 5)]
+MOVES += [tuple(m) for m in np.random.default_rng(0).integers(0, 60, size=(100, 2)).tolist()]
+DIRECTIONS = [(i % 2, (i // 2) % 2) for i in range(len(MOVES))]
+
+
+def _recorded(sim, run):
+    # (step mask, dir mask, time) of every rising STEP edge while run() steps
+    recorder = sim.recorder
+    levels = {pin: recorder.levels.get(pin, 0) for pin in DIR_PINS}
+    start = len(recorder.times)
+    run()
+    edges = []
+    for t, pin, value in zip(recorder.times[start:], recorder.pins[start:], recorder.values[start:]):
+        if pin in DIR_PINS:
+            levels[pin] = value
+        elif pin in STEP_PINS and value:
+            direction = sum(bit for p, bit in DIR_PINS.items() if levels[p])
+            edges.append((STEP_PINS[pin], direction, t))
+    return edges
+
+
+def _assert_matches(edges, stream, check_timing=True):
+    # A record stepping both axes is two consecutive edges (major axis first in moveXY)
+    assert len(edges) == sum(bin(step).count("1") for step in stream["step"].tolist())
+    starts = []
+    i = 0
+    for step, direction, _ in stream.tolist():
+        n = bin(step).count("1")
+        chunk = edges[i:i + n]
+        assert sum(mask for mask, _, _ in chunk) == step
+        assert all(d == direction for _, d, _ in chunk)
+        starts.append(chunk[0][2])
+        i += n
+    if check_timing and len(starts) > 1:
+        assert np.allclose(np.diff(starts), stream["dt"][:-1], atol=1e-5)
+
+
+def _fixed_delay_stream(delay):
+    xs, ys = zip(*MOVES)
+    xd, yd = zip(*DIRECTIONS)
+    return moves_to_stream(list(xs), list(xd), list(ys), list(yd), delay)
+
+
+def _run_moves(moveXY, delay, **kwargs):
+    def run():
+        for (dx, dy), (x_dir, y_dir) in zip(MOVES, DIRECTIONS):
+            moveXY(dx, x_dir, dy, y_dir, delay, **kwargs)
+    return run
+
+
+def test_finalfn_moveXY_fixed_delay(sim):
+    finalfn.acquire_hardware()
+    edges = _recorded(sim, _run_moves(finalfn.moveXY, 0.001, profile=False))
+    _assert_matches(edges, _fixed_delay_stream(0.001))
+
+
+def test_finalfn_moveXY_profiled(sim):
+    finalfn.acquire_hardware()
+    profile = finalfn.XY_PROFILE
+    for (dx, dy), (x_dir, y_dir) in zip(MOVES, DIRECTIONS):
+        edges = _recorded(sim, lambda: finalfn.moveXY(dx, x_dir, dy, y_dir))
+        intervals = path_profile(profile, profile, dx, dy).step_intervals(max(dx, dy))
+        _assert_matches(edges, moves_to_stream([dx], [x_dir], [dy], [y_dir], intervals=intervals))
+
+
+def test_finalfn_replay_stream(sim):
+    finalfn.acquire_hardware()
+    stream = _fixed_delay_stream(0.001)
+    edges = _recorded(sim, lambda: finalfn.replay_stream(stream))
+    _assert_matches(edges, stream)
+
+
+@pytest.mark.parametrize("script", ["tri", "NEWLIBTEST"])
+def test_script_moveXY(sim, script):
+    if ROOT not in sys.path:
+        sys.path.append(ROOT)
+    module = __import__(script)
+    if hasattr(module, "init_motors"):
+        module.init_motors()
+    edges = _recorded(sim, _run_moves(module.moveXY, 0.0005))
+    _assert_matches(edges, _fixed_delay_stream(0.0005))
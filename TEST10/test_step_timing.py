@@ -0,0 +1,35 @@
+# test_step_timing.py
+
+import numpy as np
+
+import finalfn
+from step_timing import EdgeTimer
+
+
+def test_every_xy_command_is_timed(monkeypatch):
+    finalfn.acquire_hardware()
+    timer = EdgeTimer()
+    monkeypatch.setattr(finalfn, "step_timer", timer)
+    monkeypatch.setattr(finalfn.motorX, "timer", timer)
+    monkeypatch.setattr(finalfn.motorY, "timer", timer)
+    contours = [np.array(points, dtype=np.int32).reshape(-1, 1, 2)
+                for points in ([(10, 10), (40, 12), (60, 30)], [(100, 80), (90, 120)], [(20, 150), (70, 150)])]
+    for mode in ("direct", "lookahead", "stream"):
+        commands = list(finalfn.plan_path(contours, mode))
+        timed = [c for c in commands if c[0] in ("move", "stream", "pen_travel")]
+        before = timer.summary()
+        for command in commands:
+            finalfn.run_command(command)
+        after = timer.summary()
+        assert after["moves"] - before["moves"] == len(timed)
+        assert after["steps"] - before["steps"] == sum(_timed_steps(c) for c in timed)
+
+
+def _timed_steps(command):
+    # pulse() records every motor pulse, run_timeline() every event that steps
+    if command[0] == "move":
+        return command[1] + command[3]
+    if command[0] == "stream":
+        return sum(bin(step).count("1") for step in command[1]["step"].tolist())
+    events, _ = finalfn.plan_travel_timeline(*command[1:])
+    return sum(1 for _, step_mask, _ in events if step_mask)
@@ -0,0 +1,78 @@
+# test_thinning.py
+
+import concurrent.futures
+import multiprocessing
+
+import cv2
+import numpy as np
+import pytest
+
+import finalfn
+import thinning
+from snapshot_worker import SnapshotPipeline, Split, run_inline
+
+
+def _line_art(size, seed=0):
+    # Black lines and circles on white, spread over the whole frame
+    rng = np.random.default_rng(seed)
+    img = np.full((size, size, 3), 255, dtype=np.uint8)
+    for _ in range(12):
+        p1, p2 = rng.integers(0, size, size=(2, 2)).tolist()
+        cv2.line(img, tuple(p1), tuple(p2), (0, 0, 0), 4)
+    for _ in range(6):
+        c = rng.integers(size // 8, size - size // 8, size=2).tolist()
+        cv2.circle(img, tuple(c), int(rng.integers(size // 20, size // 6)), (0, 0, 0), 4)
+    return img
+
+
+@pytest.fixture(scope="module")
+def binary():
+    return finalfn.binarize(_line_art(640))
+
+
+@pytest.mark.parametrize("backend", ["lut", "auto"])
+def test_tiled_on_a_pool_matches_thin(binary, backend):
+    reference = thinning.thin(binary, backend)
+    assert len(thinning.tile_jobs(binary, 160)) > 4
+    assert np.array_equal(thinning.thin_tiled(binary, backend, tile=160, workers=2), reference)
+    assert thinning._pool_workers == 2
+    with concurrent.futures.ProcessPoolExecutor(3, mp_context=multiprocessing.get_context("fork")) as pool:
+        assert np.array_equal(thinning.thin_tiled(binary, backend, tile=160, executor=pool), reference)
+
+
+def _thin_tiled_in_worker(binary):
+    return thinning.thin_tiled(binary, tile=160, workers=2)
+
+
+def test_tiled_refuses_to_nest_pools(binary):
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("fork")) as pool:
+        with pytest.raises(RuntimeError):
+            pool.submit(_thin_tiled_in_worker, binary).result()
+
+
+def test_snapshot_tiles_run_on_the_snapshot_pool(monkeypatch):
+    frame = _line_art(480)
+    expected = finalfn.process_snapshot(frame)
+    # Tile every snapshot, before the pool forks so its workers see it too
+    monkeypatch.setattr(thinning, "TILED_MIN_PIXELS", 0)
+    monkeypatch.setattr(thinning, "TILE_SIZE", 160)
+    split = finalfn.process_snapshot(frame)
+    assert isinstance(split, Split) and len(split.jobs) > 4
+
+    pipeline = SnapshotPipeline(finalfn.process_snapshot, workers=2)
+    pipeline.start()
+    try:
+        ticket = pipeline.submit(frame)
+        finished = []
+        while not finished:
+            finished = pipeline.poll()
+    finally:
+        pipeline.close()
+    (done_ticket, result, error), = finished
+    assert (done_ticket, error) == (ticket, None)
+    inline = run_inline(finalfn.process_snapshot, frame)
+    for got in (result, inline):
+        contours, commands, estimate = got
+        assert [c.tolist() for c in contours] == [c.tolist() for c in expected[0]]
+        assert len(commands) == len(expected[1])
+        assert estimate["total_s"] == expected[2]["total_s"]
@@ -0,0 +1,28 @@
+# test_z_calibration.py
+
+import multiprocessing
+
+import finalfn
+
+
+def test_calibration_in_another_process_reaches_estimates(tmp_path, monkeypatch):
+    monkeypatch.setattr(finalfn, "Z_CALIBRATION_FILE", str(tmp_path / "z_calibration.json"))
+    monkeypatch.setattr(finalfn, "z_contact", 100)
+    monkeypatch.setattr(finalfn, "z_calibration_mtime", None)
+    before = finalfn.lift_seconds()
+    commands = [("pen_down",)]
+    estimate_before = finalfn.estimate_plot(commands)["total_s"]
+
+    def calibrate():
+        # What the motion worker does on the 'c' key
+        finalfn.z_position = 20
+        finalfn.z_calibrate()
+
+    worker = multiprocessing.get_context("fork").Process(target=calibrate)
+    worker.start()
+    worker.join()
+    assert finalfn.z_contact == 100  # this process hasn't looked yet
+
+    assert finalfn.estimate_plot(commands)["total_s"] < estimate_before
+    assert finalfn.z_contact == 20
+    assert finalfn.lift_seconds() < before
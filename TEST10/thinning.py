@@ -0,0 +1,393 @@
+# thinning.py
+#
+# Interchangeable thinning (skeletonize) backends for process_image. All of
+# them take the binary frame (0/255 uint8, lines white) and return a 0/255
+# uint8 skeleton, one pixel wide and 8-connected:
+#
+#   "skimage"    skimage.morphology.skeletonize, the original backend
+#   "zhangsuen"  cv2.ximgproc.thinning, Zhang-Suen (needs opencv-contrib)
+#   "guohall"    cv2.ximgproc.thinning, Guo-Hall (needs opencv-contrib)
+#   "lut"        Zhang-Suen in NumPy: the 8 neighbours of every candidate
+#                pixel are packed into a byte and looked up in a 256-entry
+#                table, so a whole sub-iteration is a handful of array
+#                operations
+#
+# thin(binary, "auto") uses the first available backend in PREFERENCE. The
+# order comes from `python thinning.py`, which times every backend on the
+# benchmark corpus and scores its skeleton against skimage's.
+#
+# thin_roi() and thin_tiled() run any backend on parts of the frame (crops
+# around the ink, or overlapping tiles on every core) and give the same
+# skeleton as thinning the frame in one piece.
+
+import atexit
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+
+import cv2
+import numpy as np
+
+BACKENDS = ["skimage", "zhangsuen", "guohall", "lut"]
+# Fastest acceptable first, from `python thinning.py` on x86: skimage's
+# Cython loop wins and is the only backend that gives the reference stroke
+# graph. The rest are fallbacks for when skimage is not installed, fastest
+# first: the LUT version is ~3x slower, ximgproc slower still; both
+# Zhang-Suen variants join strokes differently and Guo-Hall drifts
+PREFERENCE = ["skimage", "lut", "zhangsuen", "guohall"]
+
+# Neighbours P2..P9 of Zhang & Suen, clockwise from north, as (dy, dx);
+# bit k of a pixel's code is set when neighbour k is foreground
+RING = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+
+
+def _zhang_suen_tables():
+    first = np.zeros(256, dtype=bool)
+    second = np.zeros(256, dtype=bool)
+    for code in range(256):
+        p = [(code >> k) & 1 for k in range(8)]
+        p2, p3, p4, p5, p6, p7, p8, p9 = p
+        neighbours = sum(p)
+        transitions = sum(p[k] == 0 and p[(k + 1) % 8] == 1 for k in range(8))
+        if not (2 <= neighbours <= 6 and transitions == 1):
+            continue
+        first[code] = p2 * p4 * p6 == 0 and p4 * p6 * p8 == 0
+        second[code] = p2 * p4 * p8 == 0 and p2 * p6 * p8 == 0
+    return first, second
+
+
+DELETE_FIRST, DELETE_SECOND = _zhang_suen_tables()
+
+
+def thin_lut(binary):
+    ys, xs = np.nonzero(binary)
+    skeleton = np.zeros(binary.shape, dtype=np.uint8)
+    if not len(ys):
+        return skeleton
+    # Work on the foreground's bounding box, padded by one so every pixel has
+    # 8 neighbours, as a flat array: neighbour k of pixel i is i + offsets[k]
+    top, bottom, left, right = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+    img = np.pad(binary[top:bottom, left:right] > 0, 1).astype(np.uint8)
+    width = img.shape[1]
+    offsets = np.array([dy * width + dx for dy, dx in RING])
+    flat = img.ravel()
+
+    # A pixel's verdict under a table only changes when a neighbour was
+    # deleted since that table last looked at it, i.e. in one of the last two
+    # sub-iterations; after the first pass only those pixels are looked at
+    candidates = np.flatnonzero(flat)
+    touched = np.zeros_like(flat)
+    recent = [candidates, candidates]  # deletions of the last two sub-iterations (all, to start)
+    tables = (DELETE_FIRST, DELETE_SECOND)
+    step = 0
+    while len(recent[0]) or len(recent[1]):
+        if step >= 2:
+            touched[(np.concatenate(recent)[:, None] + offsets).ravel()] = 1
+            candidates = np.flatnonzero(touched & flat)
+            touched[candidates] = 0
+        candidates = candidates[flat[candidates] == 1]
+        neighbours = flat[candidates[:, None] + offsets]
+        codes = np.packbits(neighbours, axis=1, bitorder="little")[:, 0]
+        delete = candidates[tables[step % 2][codes]]
+        flat[delete] = 0
+        recent = [recent[1], delete]
+        step += 1
+    skeleton[top:bottom, left:right] = img[1:-1, 1:-1] * 255
+    return skeleton
+
+
+def thin_skimage(binary):
+    from skimage.morphology import skeletonize  # ~1 s to import on the Pi, only needed here
+    return skeletonize(binary > 0).astype(np.uint8) * 255
+
+
+def _ximgproc(binary, kind):
+    if not hasattr(cv2, "ximgproc"):
+        raise RuntimeError("cv2.ximgproc not available (pip install opencv-contrib-python)")
+    thinning_type = cv2.ximgproc.THINNING_ZHANGSUEN if kind == "zhangsuen" else cv2.ximgproc.THINNING_GUOHALL
+    return cv2.ximgproc.thinning(binary, thinningType=thinning_type)
+
+
+def available(name):
+    if name in ("zhangsuen", "guohall"):
+        return hasattr(cv2, "ximgproc")
+    if name == "skimage":
+        import importlib.util
+        return importlib.util.find_spec("skimage") is not None
+    return name == "lut"
+
+
+def resolve(name):
+    """Backend name for thin(): "auto" becomes the first available in PREFERENCE."""
+    if name == "auto":
+        return next(n for n in PREFERENCE if available(n))
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown thinning backend: {name}")
+    return name
+
+
+def thin(binary, backend="auto"):
+    backend = resolve(backend)
+    if backend == "skimage":
+        return thin_skimage(binary)
+    if backend == "lut":
+        return thin_lut(binary)
+    return _ximgproc(binary, backend)
+
+
+# --- Region of interest ---
+# Thinning only looks at 3x3 neighbourhoods and separate 8-connected
+# components never touch, so each component can be thinned on its own, in a
+# crop of its bounding box. Components whose boxes lie within ROI_GAP of each
+# other share a crop (one call per stroke cluster, not per speck of noise).
+ROI_GAP = 8
+ROI_MAX_FILL = 0.6  # crops covering more of the frame than this: thin it whole
+
+
+def ink_regions(binary, gap=ROI_GAP):
+    """(labels, [[x0, y0, x1, y1, {component labels}], ...]) for the ink in a binary image."""
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    h, w = binary.shape
+    # One pixel of background around each box, as the backends expect
+    boxes = [[max(x - 1, 0), max(y - 1, 0), min(x + bw + 1, w), min(y + bh + 1, h), {label}]
+             for label, (x, y, bw, bh, _) in enumerate(stats[1:], 1)]
+    merged = True
+    while merged:
+        merged = False
+        regions = []
+        for box in sorted(boxes, key=lambda b: (b[0], b[1])):
+            for region in regions:
+                if (box[0] < region[2] + gap and region[0] < box[2] + gap
+                        and box[1] < region[3] + gap and region[1] < box[3] + gap):
+                    region[:4] = (min(box[0], region[0]), min(box[1], region[1]),
+                                  max(box[2], region[2]), max(box[3], region[3]))
+                    region[4] |= box[4]
+                    merged = True
+                    break
+            else:
+                regions.append(box)
+        boxes = regions
+    return labels, boxes
+
+
+def thin_roi(binary, backend="auto", gap=ROI_GAP, max_fill=ROI_MAX_FILL):
+    """thin() on crops around the ink only; the skeleton is the same as thinning the whole frame."""
+    labels, regions = ink_regions(binary, gap)
+    covered = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1, _ in regions)
+    if covered > max_fill * binary.size:
+        return thin(binary, backend)
+    skeleton = np.zeros(binary.shape, dtype=np.uint8)
+    for x0, y0, x1, y1, members in regions:
+        # A merged box can clip other components; keep only its own
+        tile = np.isin(labels[y0:y1, x0:x1], list(members)).astype(np.uint8) * 255
+        skeleton[y0:y1, x0:x1] |= thin(tile, backend)
+    return skeleton
+
+
+# --- Tiled, on every core ---
+# Big frames are cut into TILE_SIZE squares, each thinned in a pool worker
+# together with a margin of its neighbours, and only the tile itself is kept.
+# A pixel's fate depends on pixels at most two per iteration away (one per
+# sub-iteration), and thinning needs about as many iterations as the widest
+# stroke is half wide, so the margin comes from the distance transform.
+#
+# thin_tiled() runs the tiles on a pool of its own, forked on first use, or
+# on the executor it is given. A pool worker can't hand work to its own
+# pool, so the snapshot pipeline uses tile_jobs()/stitch() instead and
+# spreads the tiles over the snapshot pool (see finalfn.process_snapshot).
+TILE_SIZE = 512
+TILED_MIN_PIXELS = 1200 * 1200  # below this the pool costs more than it saves
+
+_pool = None
+_pool_workers = 0
+
+
+def tile_margin(binary):
+    half_width = cv2.distanceTransform(binary, cv2.DIST_C, 3).max()
+    return 2 * int(half_width) + 4
+
+
+def _tile_pool(workers):
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        close()
+        _pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+        _pool_workers = workers
+    return _pool
+
+
+def start_pool(workers=None):
+    """Fork the tile pool now (before any camera thread or GUI exists) and return it."""
+    pool = _tile_pool(workers or os.cpu_count())
+    pool.submit(int).result()  # a fork pool starts all its workers on the first submit
+    return pool
+
+
+@atexit.register
+def close():
+    """Shut down the tile pool (it is started again on the next thin_tiled())."""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+    _pool = None
+    _pool_workers = 0
+
+
+def tile_jobs(binary, tile=TILE_SIZE):
+    """[(y, x, y0, x0, crop)] for every tile with ink; crop is the tile plus its margin at (y0, x0)."""
+    margin = tile_margin(binary)
+    h, w = binary.shape
+    jobs = []
+    for y in range(0, h, tile):
+        for x in range(0, w, tile):
+            if not binary[y:y + tile, x:x + tile].any():
+                continue  # no ink, no skeleton
+            y0, x0 = max(y - margin, 0), max(x - margin, 0)
+            jobs.append((y, x, y0, x0, binary[y0:min(y + tile + margin, h), x0:min(x + tile + margin, w)]))
+    return jobs
+
+
+def stitch(shape, placements, results, tile=TILE_SIZE):
+    """Skeleton from the thinned crops; placements: the (y, x, y0, x0) of each tile_jobs() entry."""
+    skeleton = np.zeros(shape, dtype=np.uint8)
+    for (y, x, y0, x0), result in zip(placements, results):
+        skeleton[y:y + tile, x:x + tile] = result[y - y0:y - y0 + tile, x - x0:x - x0 + tile]
+    return skeleton
+
+
+def thin_tiled(binary, backend="auto", tile=TILE_SIZE, workers=None, executor=None):
+    """thin() in overlapping tiles, stitched seamlessly.
+
+    The tiles run on `executor` when given, else on a pool of `workers`
+    processes (default: every core); workers=1 thins them here, one by one.
+    """
+    backend = resolve(backend)
+    workers = workers or os.cpu_count()
+    jobs = tile_jobs(binary, tile)
+    tiles = [job[4] for job in jobs]
+    if executor is None and workers > 1 and len(jobs) > 1:
+        if multiprocessing.parent_process() is not None:
+            raise RuntimeError("thin_tiled() in a worker process would nest pools; pass executor= or workers=1")
+        executor = _tile_pool(workers)
+    if executor is None:
+        results = map(thin, tiles, itertools.repeat(backend))
+    else:
+        results = executor.map(thin, tiles, itertools.repeat(backend))
+    return stitch(binary.shape, [job[:4] for job in jobs], results, tile)
+
+
+# --- Skeleton quality, relative to a reference skeleton ---
+def quality(skeleton, reference):
+    from skeleton_graph import skeleton_strokes
+
+    kernel = np.ones((3, 3), dtype=np.uint8)
+    on, ref = skeleton > 0, reference > 0
+    near_on = cv2.dilate(on.astype(np.uint8), kernel) > 0
+    near_ref = cv2.dilate(ref.astype(np.uint8), kernel) > 0
+    # 2x2 solid blocks: the skeleton is not one pixel wide there
+    def thick_blocks(mask):
+        return int((mask[:-1, :-1] & mask[1:, :-1] & mask[:-1, 1:] & mask[1:, 1:]).sum())
+
+    return {
+        "pixels": int(on.sum()),
+        "recall": round(float((ref & near_on).sum() / max(ref.sum(), 1)), 4),
+        "precision": round(float((on & near_ref).sum() / max(on.sum(), 1)), 4),
+        "components": cv2.connectedComponents(on.astype(np.uint8), connectivity=8)[0] - 1,
+        "reference_components": cv2.connectedComponents(ref.astype(np.uint8), connectivity=8)[0] - 1,
+        "thick_blocks": thick_blocks(on),
+        "reference_thick_blocks": thick_blocks(ref),
+        "strokes": len(skeleton_strokes(skeleton)),
+        "reference_strokes": len(skeleton_strokes(reference)),
+    }
+
+
+def acceptable(q, min_match=0.98):
+    # Within a pixel of the reference almost everywhere, same topology
+    # (components and the strokes skeleton_strokes() finds), no thicker
+    return (q["recall"] >= min_match and q["precision"] >= min_match
+            and q["components"] == q["reference_components"]
+            and q["strokes"] == q["reference_strokes"]
+            and q["thick_blocks"] <= q["reference_thick_blocks"])
+
+
+if __name__ == "__main__":
+    # Speed and skeleton quality of every available backend on the benchmark corpus
+    import argparse
+    import statistics
+    import time
+
+    import bench_pipeline
+
+    parser = argparse.ArgumentParser(description="Compare the thinning backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=bench_pipeline.SIZES)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--tiled-sizes", type=int, nargs="+", default=[1920, 3840])
+    args = parser.parse_args()
+
+    backends = [name for name in BACKENDS if available(name)]
+    print("unavailable:", [name for name in BACKENDS if name not in backends] or "none")
+    ok = {name: True for name in backends}
+    speed = {name: [] for name in backends}
+    for image, size, img in bench_pipeline.corpus(args.sizes):
+        binary = bench_pipeline.finalfn.binarize(img)
+        reference = thin_skimage(binary)
+        for name in backends:
+            times = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                skeleton = thin(binary, name)
+                times.append(time.perf_counter() - start)
+            q = quality(skeleton, reference)
+            ok[name] &= acceptable(q)
+            speed[name].append(statistics.median(times))
+            print(f"{image:>12} {size:5d} {name:<10} {statistics.median(times) * 1000:8.2f} ms"
+                  f"  recall {q['recall']:.3f} precision {q['precision']:.3f}"
+                  f"  components {q['components']}/{q['reference_components']}"
+                  f"  strokes {q['strokes']}/{q['reference_strokes']}  thick {q['thick_blocks']}")
+    ranking = sorted(backends, key=lambda name: sum(speed[name]))
+    print("fastest first:", ", ".join(f"{n} ({sum(speed[n]) * 1000:.1f} ms{'' if ok[n] else ', not acceptable'})"
+                                      for n in ranking))
+    print("auto picks:", resolve("auto"))
+
+    # ROI cropping, on the corpus and on the same images shrunk into a corner
+    # of the frame (a small drawing on a big sheet)
+    def sparse(img, scale=3):
+        frame = np.full_like(img, 255)
+        h, w = img.shape[:2]
+        frame[:h // scale, :w // scale] = cv2.resize(img, (w // scale, h // scale), interpolation=cv2.INTER_AREA)
+        return frame
+
+    for image, size, img in bench_pipeline.corpus(args.sizes):
+        for layout, frame in (("full", img), ("sparse", sparse(img))):
+            binary = bench_pipeline.finalfn.binarize(frame)
+            results = {}
+            for name, fn in (("whole", thin), ("roi", thin_roi)):
+                times = []
+                for _ in range(args.repeats):
+                    start = time.perf_counter()
+                    results[name] = fn(binary)
+                    times.append(time.perf_counter() - start)
+                results[name + "_ms"] = statistics.median(times) * 1000
+            regions = len(ink_regions(binary)[1])
+            print(f"{image:>12} {size:5d} {layout:<7} whole {results['whole_ms']:8.2f} ms  roi {results['roi_ms']:8.2f} ms"
+                  f"  ({regions} regions, identical: {np.array_equal(results['whole'], results['roi'])})")
+
+    # Tiled thinning on big synthetic frames: one process vs every core
+    def timed(fn, *fn_args, **kwargs):
+        times = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            result = fn(*fn_args, **kwargs)
+            times.append(time.perf_counter() - start)
+        return result, statistics.median(times) * 1000
+
+    cores = os.cpu_count()
+    for size in args.tiled_sizes:
+        binary = bench_pipeline.finalfn.binarize(bench_pipeline.synthetic_image(size))
+        whole, whole_ms = timed(thin, binary)
+        serial, serial_ms = timed(thin_tiled, binary, workers=1)
+        parallel, parallel_ms = timed(thin_tiled, binary, workers=cores)
+        print(f"{'synthetic':>12} {size:5d} tiled   whole {whole_ms:8.2f} ms  1 worker {serial_ms:8.2f} ms"
+              f"  {cores} workers {parallel_ms:8.2f} ms  (margin {tile_margin(binary)} px,"
+              f" identical: {np.array_equal(whole, serial) and np.array_equal(whole, parallel)})")
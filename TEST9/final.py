@@ -1,16 +1,17 @@
 import cv2
 import numpy as np
-from skimage.morphology import skeletonize
-import gpiod
+import os
+import sys
+
+# Shared modules (camera.py) live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from camera import LatestFrameCapture
 import time
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from matplotlib.figure import Figure
-import io
-from PIL import Image
-import RPi.GPIO as GPIO
 
 # --- Motor Setup ---
-GPIO.setmode(GPIO.BCM)  # Use BCM numbering
+# RPi.GPIO is imported and the motors set up by init_motors() when the first
+# drawing starts; skimage/matplotlib are imported where they are first used
+GPIO = None
 
 class StepperMotor:
     def __init__(self, dir_pin, step_pin, name="Motor"):
@@ -46,9 +47,18 @@ class StepperMotor:
         GPIO.output(self.dir_pin, GPIO.LOW)
         GPIO.output(self.step_pin, GPIO.LOW)
 
-motorX = StepperMotor(12, 16, name="X")
-motorY = StepperMotor(13, 6, name="Y")
-motorZ = StepperMotor(18, 19, name="Z")  
+motorX = motorY = motorZ = None
+
+def init_motors():
+    global GPIO, motorX, motorY, motorZ
+    if motorX is not None:
+        return
+    import RPi.GPIO
+    GPIO = RPi.GPIO
+    GPIO.setmode(GPIO.BCM)  # Use BCM numbering
+    motorX = StepperMotor(12, 16, name="X")
+    motorY = StepperMotor(13, 6, name="Y")
+    motorZ = StepperMotor(18, 19, name="Z")
 
 def z_down():
     motorZ.set_direction(1)  # Down
@@ -91,6 +101,8 @@ def moveXY(x_steps, x_dir, y_steps, y_dir, delay=0.001):
                 err += dy
 
 def cleanup_all():
+    if motorX is None:
+        return
     motorX.cleanup()
     motorY.cleanup()
     motorZ.cleanup()
@@ -98,6 +110,7 @@ def cleanup_all():
 
 # --- Skeleton Processing ---
 def process_image(frame):
+    from skimage.morphology import skeletonize
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     _, binary = cv2.threshold(gray, 80, 255, cv2.THRESH_BINARY_INV)
     skeleton = skeletonize(binary > 0).astype(np.uint8) * 255
@@ -117,6 +130,7 @@ def wait_for_key_prompt(window_name, message):
             break
 
 def execute_path(contours):
+    init_motors()
     #z_down()
     #time.sleep(0.5)
     current_x = 0
@@ -181,70 +195,84 @@ def mouse_callback(event, x, y, flags, param):
         if x1 <= x <= x2 and y1 <= y <= y2:
             button_clicked = True
 
-cv2.namedWindow(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN)
-cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-cv2.setMouseCallback(WINDOW_NAME, mouse_callback)
-
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("Camera not available")
-    exit()
-
-try:
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            continue
-
-        h, w = frame.shape[:2]
-        min_dim = min(h, w)
-        cx, cy = w // 2, h // 2
-        square_frame = frame[cy - min_dim//2:cy + min_dim//2, cx - min_dim//2:cx + min_dim//2]
-        square_frame = cv2.resize(square_frame, (DISPLAY_SIZE, DISPLAY_SIZE))
-
-        canvas_width = DISPLAY_SIZE + BUTTON_WIDTH
-        canvas = np.ones((DISPLAY_SIZE, canvas_width, 3), dtype=np.uint8) * 50
-        canvas[:, :DISPLAY_SIZE] = square_frame
-
-        x1, y1, x2, y2 = button_coords
-        cv2.rectangle(canvas, (x1, y1), (x2, y2), (200, 200, 200), -1)
-        cv2.putText(canvas, "Snapshot", (x1 + 10, y1 + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
-
-        cv2.imshow(WINDOW_NAME, canvas)
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
-
-        if button_clicked:
-            skeleton, contours = process_image(square_frame)
-
-            # Show contour overlay
-            fig = Figure(figsize=(5, 5), dpi=100)
-            ax = fig.add_subplot(1, 1, 1)
-            for contour in contours:
-                coords = contour.reshape(-1, 2)
-                xs, ys = zip(*coords)
-                ax.plot(xs, ys, marker='.', linestyle='-', linewidth=0.5)
-            ax.set_title("Skeleton Contours")
-            ax.invert_yaxis()
-            ax.axis('equal')
-            ax.grid(True)
-            canvas_plot = FigureCanvas(fig)
-            buf = io.BytesIO()
-            canvas_plot.print_png(buf)
-            buf.seek(0)
-            img_pil = Image.open(buf).convert('RGB')
-            img_np = np.array(img_pil)
-            plot_img = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
-            cv2.imshow("Skeleton Plot", plot_img)
-            cv2.waitKey(3000)
-            cv2.destroyWindow("Skeleton Plot")
-
-            # Execute motor movement
-            execute_path(contours)
-            button_clicked = False
-
-finally:
-    cap.release()
-    cv2.destroyAllWindows()
-    cleanup_all()
+def render_contour_plot(contours):
+    # matplotlib and PIL take seconds to import on the Pi; load them on the first snapshot
+    from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+    from matplotlib.figure import Figure
+    import io
+    from PIL import Image
+
+    fig = Figure(figsize=(5, 5), dpi=100)
+    ax = fig.add_subplot(1, 1, 1)
+    for contour in contours:
+        coords = contour.reshape(-1, 2)
+        xs, ys = zip(*coords)
+        ax.plot(xs, ys, marker='.', linestyle='-', linewidth=0.5)
+    ax.set_title("Skeleton Contours")
+    ax.invert_yaxis()
+    ax.axis('equal')
+    ax.grid(True)
+    canvas_plot = FigureCanvas(fig)
+    buf = io.BytesIO()
+    canvas_plot.print_png(buf)
+    buf.seek(0)
+    img_pil = Image.open(buf).convert('RGB')
+    img_np = np.array(img_pil)
+    return cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+
+def main():
+    global button_clicked
+    cv2.namedWindow(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN)
+    cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+    cv2.setMouseCallback(WINDOW_NAME, mouse_callback)
+
+    cap = LatestFrameCapture(0)
+    if not cap.isOpened():
+        print("Camera not available")
+        return
+
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                continue
+
+            h, w = frame.shape[:2]
+            min_dim = min(h, w)
+            cx, cy = w // 2, h // 2
+            square_frame = frame[cy - min_dim//2:cy + min_dim//2, cx - min_dim//2:cx + min_dim//2]
+            square_frame = cv2.resize(square_frame, (DISPLAY_SIZE, DISPLAY_SIZE))
+
+            canvas_width = DISPLAY_SIZE + BUTTON_WIDTH
+            canvas = np.ones((DISPLAY_SIZE, canvas_width, 3), dtype=np.uint8) * 50
+            canvas[:, :DISPLAY_SIZE] = square_frame
+
+            x1, y1, x2, y2 = button_coords
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), (200, 200, 200), -1)
+            cv2.putText(canvas, "Snapshot", (x1 + 10, y1 + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+
+            cv2.imshow(WINDOW_NAME, canvas)
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                break
+
+            if button_clicked:
+                skeleton, contours = process_image(square_frame)
+
+                # Show contour overlay
+                plot_img = render_contour_plot(contours)
+                cv2.imshow("Skeleton Plot", plot_img)
+                cv2.waitKey(3000)
+                cv2.destroyWindow("Skeleton Plot")
+
+                # Execute motor movement
+                execute_path(contours)
+                button_clicked = False
+
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
+        cleanup_all()
+
+if __name__ == "__main__":
+    main()
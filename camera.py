@@ -0,0 +1,95 @@
+# camera.py
+#
+# cv2.VideoCapture with the grabbing moved to a background thread. The
+# thread reads frames as fast as the camera delivers them into a small ring
+# of reused buffers and publishes the newest one in a latest-frame slot:
+#
+#   - the UI loop never waits on exposure and never drains a backlog of old
+#     frames from the driver buffer, so snapshots are never stale,
+#   - latest() hands out the freshest frame immediately (snapshot button),
+#   - every frame carries its capture timestamp (time.monotonic()) and a
+#     sequence number, so skipped frames and frame age can be reported.
+#
+# Three buffers: the published frame, the one the caller is still using
+# (valid until its next read()/latest()) and the one being filled.
+#
+# LatestFrameCapture(0) is a drop-in for cv2.VideoCapture(0) in the preview
+# loops: isOpened(), read() and release() behave the same. size=(width,
+# height) asks the camera for that resolution; the driver may pick the
+# nearest one it supports.
+#
+# Shared by the camera scripts in the repository root, TEST9/final.py and
+# TEST10/finalfn.py; scripts in a subfolder append the repository root to
+# sys.path (appended, so their own modules still come first).
+
+import threading
+import time
+
+import cv2
+
+
+class LatestFrameCapture:
+    def __init__(self, source=0, api=cv2.CAP_ANY, size=None):
+        self.cap = cv2.VideoCapture(source, api)
+        if size is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        self.buffers = [None, None, None]
+        self.latest_index = None   # slot published by the grabber
+        self.reader_index = None   # slot the caller is using
+        self.sequence = 0          # frames grabbed so far
+        self.timestamp = None      # capture time of the latest frame
+        self.returned = 0          # sequence number last handed out
+        self.dropped = 0           # frames overwritten before anyone read them
+        self.cond = threading.Condition()
+        self.running = self.cap.isOpened()
+        self.thread = threading.Thread(target=self._grab_loop, daemon=True)
+        if self.running:
+            self.thread.start()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def _grab_loop(self):
+        while self.running:
+            with self.cond:
+                write = next(i for i in range(3) if i != self.latest_index and i != self.reader_index)
+            ok, frame = self.cap.read(self.buffers[write])
+            stamp = time.monotonic()
+            if not ok:
+                time.sleep(0.01)  # camera hiccup or end of a file source
+                continue
+            with self.cond:
+                if self.sequence > self.returned:
+                    self.dropped += 1
+                self.buffers[write] = frame
+                self.latest_index = write
+                self.sequence += 1
+                self.timestamp = stamp
+                self.cond.notify_all()
+
+    def latest(self):
+        """(frame, timestamp, sequence) of the newest frame without waiting; frame is None before the first."""
+        with self.cond:
+            if self.latest_index is None:
+                return None, None, 0
+            self.reader_index = self.latest_index
+            self.returned = self.sequence
+            return self.buffers[self.reader_index], self.timestamp, self.sequence
+
+    def read(self, timeout=1.0):
+        """Like VideoCapture.read(): waits for a frame newer than the last one returned."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.sequence > self.returned or not self.running, timeout):
+                return False, None
+        frame, _, _ = self.latest()
+        return frame is not None, frame
+
+    def frame_age(self):
+        return None if self.timestamp is None else time.monotonic() - self.timestamp
+
+    def release(self):
+        self.running = False
+        if self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        self.cap.release()
@@ -0,0 +1,37 @@
+# line_shadow.py
+#
+# Shared by tri.py and TEST/motor_control.py (scripts in a subfolder append
+# the repository root to sys.path to import it).
+
+import gpiod
+
+
+class LineShadow:
+    # One gpiod request for the lines of every motor plus an in-memory copy
+    # of their levels: nothing is read back from the kernel, and a write only
+    # reaches set_values() (one ioctl for every line) when a level changes.
+    def __init__(self, chip_name, pins, consumer="mp6500"):
+        self.chip = gpiod.Chip(chip_name)
+        self.pins = list(pins)
+        self.lines = self.chip.get_lines(self.pins)
+        self.values = [0] * len(self.pins)
+        self.lines.request(consumer=consumer, type=gpiod.LINE_REQ_DIR_OUT, default_vals=self.values)
+        self.ioctl_count = 0
+
+    def index(self, pin):
+        return self.pins.index(pin)
+
+    def write(self, changes):
+        # changes: {line index: value}, any number of lines/motors at once
+        dirty = False
+        for i, value in changes.items():
+            if self.values[i] != value:
+                self.values[i] = value
+                dirty = True
+        if dirty:
+            self.lines.set_values(self.values)
+            self.ioctl_count += 1
+
+    def release(self):
+        self.lines.release()
+        self.chip.close()
@@ -1,40 +1,33 @@
 import numpy as np
-import gpiod
 import time
 
+from line_shadow import LineShadow
+
 # --- Motor Setup ---
 class StepperMotor:
-    def __init__(self, chip_name, dir_pin, step_pin, name="Motor"):
-        self.chip = gpiod.Chip(chip_name)
-        self.pins = [dir_pin, step_pin]
-        self.lines = self.chip.get_lines(self.pins)
-        self.lines.request(consumer="mp6500", type=gpiod.LINE_REQ_DIR_OUT)
+    def __init__(self, shadow, dir_pin, step_pin, name="Motor"):
+        self.shadow = shadow
+        self.dir_index = shadow.index(dir_pin)
+        self.step_index = shadow.index(step_pin)
         self.name = name
 
     def set_direction(self, direction):
-        values = self.lines.get_values()
-        values[0] = direction
-        self.lines.set_values(values)
+        self.shadow.write({self.dir_index: direction})
 
     def pulse(self, delay=0.001):
-        values = self.lines.get_values()
-        values[1] = 1
-        self.lines.set_values(values)
+        self.shadow.write({self.step_index: 1})
         time.sleep(delay)
-        values[1] = 0
-        self.lines.set_values(values)
+        self.shadow.write({self.step_index: 0})
         time.sleep(delay)
 
-    def cleanup(self):
-        self.lines.release()
-        self.chip.close()
-
-motorX = StepperMotor("gpiochip4", 12, 16, name="X")
-motorY = StepperMotor("gpiochip4", 13, 6, name="Y")
+lines = LineShadow("gpiochip4", [12, 16, 13, 6])
+motorX = StepperMotor(lines, 12, 16, name="X")
+motorY = StepperMotor(lines, 13, 6, name="Y")
 
 def moveXY(x_steps, x_dir, y_steps, y_dir, delay=0.001):
-    motorX.set_direction(x_dir)
-    motorY.set_direction(y_dir)
+    # Returns the number of set_values() ioctls the move needed
+    start_ioctls = lines.ioctl_count
+    lines.write({motorX.dir_index: x_dir, motorY.dir_index: y_dir})
 
     x = 0
     y = 0
@@ -63,15 +56,16 @@ def moveXY(x_steps, x_dir, y_steps, y_dir, delay=0.001):
                 motorX.pulse(delay)
                 x += sx
                 err += dy
+    return lines.ioctl_count - start_ioctls
 
 def cleanup_all():
-    motorX.cleanup()
-    motorY.cleanup()
+    lines.release()
 
 # --- Motion Execution ---
 STEPS_PER_PIXEL = 1
 
 def execute_path(contours):
+    ioctls = 0
     for contour in contours:
         time.sleep(2)  # Manual Z adjustment pause
         last_x, last_y = contour[0][0]
@@ -83,8 +77,9 @@ def execute_path(contours):
             steps_y = int(abs(dy) * STEPS_PER_PIXEL)
             dir_x = 1 if dx > 0 else 0
             dir_y = 1 if dy > 0 else 0
-            moveXY(steps_x, dir_x, steps_y, dir_y)
+            ioctls += moveXY(steps_x, dir_x, steps_y, dir_y)
             last_x, last_y = x, y
+    return ioctls
 
 # --- Shape Generators ---
 def simulate_contour(points):
@@ -116,7 +111,8 @@ if __name__ == "__main__":
         contours = simulate_contour(points)
         print("Drawing:", shape)
         time.sleep(2)
-        execute_path(contours)
+        ioctls = execute_path(contours)
+        print("GPIO ioctls:", ioctls)
 
     finally:
         cleanup_all()